@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-from typing import Optional
+from typing import List, Literal, Optional
 import os
 import json
 
@@ -12,6 +12,141 @@ class Settings(BaseSettings):
     gcp_region: str = "us-central1"
     environment: str = "development"
 
+    # Upper bound on concurrent in-flight upstream calls per provider
+    gemini_max_concurrency: int = 16
+    imagen_max_concurrency: int = 8
+    # Upstream quotas per model (0 = unlimited); the limiter adapts down on 429s
+    gemini_requests_per_minute: int = 1000
+    gemini_tokens_per_minute: int = 1000000
+    imagen_requests_per_minute: int = 20
+    # Retries with jittered exponential backoff for 429/5xx and timeouts
+    upstream_max_retries: int = 4
+    upstream_retry_base_delay: float = 1.0
+    upstream_retry_max_delay: float = 30.0
+    # Circuit breaker: consecutive failures before failing fast, and cool-down
+    upstream_breaker_threshold: int = 5
+    upstream_breaker_reset: float = 30.0
+    # Per-campaign caps for the caption and image stages of the pipeline
+    campaign_caption_concurrency: int = 8
+    campaign_image_concurrency: int = 4
+    # Captions requested per model call for campaigns and post batches
+    # (1 = one call per post)
+    campaign_batch_size: int = 10
+    # POST /api/posts/batch: items per request, and caps for its caption
+    # and image stages across all of its items
+    post_batch_max_items: int = 100
+    post_batch_caption_concurrency: int = 8
+    post_batch_image_concurrency: int = 4
+    # Extra calls asking only for the caption fields that came back invalid
+    caption_repair_attempts: int = 1
+
+    # Prompt files (defaults to backend/prompts); changes are picked up
+    # within the reload interval in seconds (0 = load once)
+    prompt_dir: Optional[str] = None
+    prompt_reload_interval: float = 2.0
+
+    # Gemini context caching of each template's static prompt prefix:
+    # None (off), "gemini" or "fake" (in-process stand-in for tests). Prefixes
+    # shorter than the API's minimum cacheable size are always sent inline.
+    context_cache: Optional[Literal["gemini", "fake"]] = None
+    context_cache_ttl: int = 3600
+    context_cache_refresh_margin: int = 300
+    context_cache_min_tokens: int = 1024
+
+    # Model backend: "google" or "fake" (offline stand-in for load tests;
+    # latencies are medians in seconds, spread log-normally by sigma)
+    model_backend: Literal["google", "fake"] = "google"
+    fake_text_latency: float = 0.5
+    fake_image_latency: float = 4.0
+    fake_latency_sigma: float = 0.3
+    fake_error_rate: float = 0.0
+    fake_error_status: int = 503
+    fake_image_size: int = 1024
+    fake_seed: Optional[int] = None
+
+    # Caption response cache: None (off), "memory" or "sqlite"
+    caption_cache: Optional[Literal["memory", "sqlite"]] = None
+    caption_cache_ttl: int = 3600
+    caption_cache_max_entries: int = 1024
+    caption_cache_path: str = "caption_cache.db"
+
+    # Post/campaign storage ("memory" or "sqlite"); use sqlite to share state
+    # between uvicorn workers and keep it across restarts
+    repository: str = "memory"
+    sqlite_path: str = "orchestrator.db"
+
+    # Background jobs: backend name and in-process worker count (0 = API
+    # only, which needs the shared "sqlite" backend)
+    job_backend: Literal["memory", "sqlite"] = "memory"
+    job_workers: int = 4
+    # Run jobs inside the submitting request instead (serverless hosts such
+    # as Vercel, where background workers may be frozen or never run)
+    job_inline: bool = False
+    # Seconds a finished job stays readable at GET /api/jobs/{id}
+    job_ttl: float = 3600.0
+    # SQLite job backend: database file (defaults to sqlite_path), seconds
+    # between polls for new jobs, and seconds before a silent worker's job
+    # is handed to another worker
+    job_sqlite_path: Optional[str] = None
+    job_poll_interval: float = 0.5
+    job_lease: float = 900.0
+
+    # Scheduler that publishes due posts and fills lazy campaign slots; safe
+    # to run in every worker. Off by default: it needs the webhook publisher
+    scheduler_enabled: bool = False
+    # Posts due within this many seconds are kept in memory, refreshed from
+    # the repository every sync interval
+    scheduler_lookahead: int = 3600
+    scheduler_sync_interval: int = 60
+    scheduler_concurrency: int = 8
+    # Lazy campaigns: generate each post this many seconds before its slot
+    campaign_generation_lead: int = 86400
+    # Seconds before a post left generating (crashed or cancelled worker) is
+    # made pending again
+    scheduler_generate_lease: int = 900
+    # Seconds before a post left publishing is scheduled again; publishers
+    # may then deliver it twice, so keep this above their timeout
+    scheduler_publish_lease: int = 300
+    # Where due posts go: "webhook", or "local" (stub for tests that sends
+    # nothing; the scheduler refuses to start with it)
+    publisher: str = "local"
+    publisher_webhook_url: Optional[str] = None
+
+    # Generated media storage ("local" or "s3")
+    blob_store: str = "local"
+    blob_store_dir: str = "media"
+    s3_bucket: Optional[str] = None
+    s3_endpoint_url: Optional[str] = None
+    s3_region: Optional[str] = None
+    s3_prefix: str = ""
+    # Prefix for image URLs stored on posts; relative URLs when unset
+    public_base_url: Optional[str] = None
+
+    # Provider image bytes in these formats are stored as-is
+    image_passthrough_types: List[str] = ["image/png", "image/jpeg", "image/webp"]
+    # Re-encode every generated image to this format (off by default)
+    image_transcode_format: Optional[Literal["webp", "jpeg", "png"]] = None
+    image_quality: int = 85
+    # Thumbnail widths served by /api/images/{key}?w=, rendered once and stored
+    image_thumbnail_widths: List[int] = [256, 512]
+    image_thumbnail_format: Literal["webp", "jpeg", "png"] = "webp"
+    image_process_workers: int = 2
+    # Preselect the best of several image variants: None (first returned),
+    # "sharpness" or "entropy"
+    image_variant_scorer: Optional[Literal["sharpness", "entropy"]] = None
+
+    # Tracing: None (spans are no-ops), "otlp" (collector at TRACING_ENDPOINT,
+    # default localhost:4318), "file" (JSON lines) or "console". Needs
+    # opentelemetry-sdk (and opentelemetry-exporter-otlp-proto-http for otlp).
+    tracing_exporter: Optional[Literal["otlp", "file", "console"]] = None
+    tracing_endpoint: Optional[str] = None
+    tracing_file: str = "traces.jsonl"
+    tracing_service_name: str = "orchestrator"
+    # Share of traces kept; info/debug logs inside dropped traces are dropped too
+    tracing_sample_ratio: float = 1.0
+    log_level: str = "INFO"
+    log_format: Literal["text", "json"] = "text"
+
     class Config:
         env_file = ".env"
 
@@ -1,12 +1,59 @@
-from fastapi import FastAPI
+import asyncio
+import importlib
+import math
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from backend.config import settings
+from backend.routers import campaigns, images, jobs, posts, templates
+from backend.services import image_processing
+from backend.services.gemini_service import get_gemini_service
+from backend.services.imagen_service import get_imagen_service
+from backend.services.job_queue import job_queue
+from backend.services.metrics import MetricsMiddleware, stats_collector
+from backend.services.prompt_registry import get_prompt_registry
+from backend.services.repository import repository
+from backend.services.response_cache import caption_cache
+from backend.services.scheduler import scheduler
+from backend.services.tracing import TracingMiddleware, setup_tracing, shutdown_tracing
+from backend.services.upstream import UpstreamUnavailableError
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_tracing()
+    await repository.connect()
+    # In-process generation workers (JOB_WORKERS=0 for an API-only tier)
+    job_queue.start()
+    if settings.scheduler_enabled:
+        scheduler.start()
+    # Load the model SDK in a thread once the app is serving, so the first
+    # generation request doesn't pay for the import on the event loop
+    preload = asyncio.create_task(asyncio.to_thread(importlib.import_module, "google.genai"))
+    yield
+    await asyncio.gather(preload, return_exceptions=True)
+    await scheduler.stop()
+    await job_queue.stop()
+    image_processing.shutdown()
+    await repository.close()
+    await caption_cache.close()
+    gemini_service = get_gemini_service()
+    if gemini_service.context_cache:
+        await gemini_service.context_cache.close()
+    shutdown_tracing()
 
-from backend.routers import campaigns, posts, templates
 
 app = FastAPI(
     title="Media Orchestrator API",
     description="AI-powered content generation and scheduling",
     version="1.0.0",
+    lifespan=lifespan,
+    # Serialized with orjson; hot read endpoints send pre-serialized bytes
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware
@@ -21,12 +68,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+app.add_middleware(TracingMiddleware)
+# Outermost, so the timings include every other middleware
+app.add_middleware(MetricsMiddleware)
+
+stats_collector.add_cache("caption", caption_cache.stats)
+stats_collector.add_cache(
+    "context",
+    lambda: (
+        get_gemini_service().context_cache.stats()
+        if get_gemini_service().context_cache else None
+    ),
+)
+stats_collector.add_queue("jobs", job_queue.backend.depth)
+stats_collector.add_queue("scheduler", lambda: scheduler.stats()["queued"])
+
+@app.exception_handler(UpstreamUnavailableError)
+async def upstream_unavailable(request: Request, exc: UpstreamUnavailableError):
+    """Quota exhaustion and open circuits are retryable for the client: 503"""
+    headers = {}
+    if exc.retry_after is not None:
+        headers["Retry-After"] = str(math.ceil(exc.retry_after))
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers=headers)
+
 
 # Include routers
 app.include_router(templates.router, prefix="/api/templates", tags=["templates"])
 app.include_router(posts.router, prefix="/api/posts", tags=["posts"])
 app.include_router(campaigns.router, prefix="/api/campaigns", tags=["campaigns"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
+app.include_router(images.router, prefix="/api/images", tags=["images"])
 
 
 @app.get("/")
@@ -37,3 +110,39 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
+
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    gemini_service, imagen_service = get_gemini_service(), get_imagen_service()
+    return {
+        "caption": caption_cache.stats(),
+        "caption_inflight": gemini_service.inflight.stats(),
+        "image_inflight": imagen_service.inflight.stats(),
+        "context": (
+            gemini_service.context_cache.stats() if gemini_service.context_cache else None
+        ),
+        "upstream": {
+            "gemini": gemini_service.upstream.stats(),
+            "imagen": imagen_service.upstream.stats(),
+        },
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/api/scheduler/stats")
+async def scheduler_stats():
+    return scheduler.stats()
+
+
+@app.post("/api/prompts/reload")
+async def reload_prompts():
+    """Re-read the prompt files now instead of waiting for the reload interval"""
+    prompts = get_prompt_registry()
+    prompts.load()
+    return {"version": prompts.version}
@@ -25,8 +25,13 @@ class Template(BaseModel):
 
 
 class PostStatus(str, Enum):
+    # Slot of a lazy campaign; content is generated shortly before it is due
+    PENDING = "pending"
+    GENERATING = "generating"
     DRAFT = "draft"
     SCHEDULED = "scheduled"
+    # Claimed by a scheduler; being handed to the publisher
+    PUBLISHING = "publishing"
     PUBLISHED = "published"
     FAILED = "failed"
 
@@ -36,6 +41,24 @@ class GenerateContentRequest(BaseModel):
     custom_prompt: Optional[str] = None
     tone: Optional[str] = "professional"
     include_hashtags: bool = True
+    # Skip the caption cache, or ask for a distinct (separately cached) variation
+    bypass_cache: bool = False
+    variation: Optional[str] = None
+
+
+class GeneratedContent(BaseModel):
+    """Structured caption output requested from the text model"""
+
+    caption: str = Field(min_length=1)
+    hashtags: List[str] = []
+    image_prompt: str = Field(min_length=1)
+
+
+class ImageVariant(BaseModel):
+    url: str
+    thumbnail_url: Optional[str] = None
+    # Local quality score when IMAGE_VARIANT_SCORER is set (higher is better)
+    score: Optional[float] = None
 
 
 class Post(BaseModel):
@@ -43,10 +66,18 @@ class Post(BaseModel):
     template_type: TemplateType
     caption: str
     image_url: Optional[str] = None
+    # Alternatives from the same Imagen call; image_url is the selected one
+    image_variants: List[ImageVariant] = []
     image_prompt: Optional[str] = None
     hashtags: List[str] = []
     scheduled_at: Optional[datetime] = None
     status: PostStatus = PostStatus.DRAFT
+    error: Optional[str] = None
+    campaign_id: Optional[str] = None
+    published_at: Optional[datetime] = None
+    # When a scheduler claimed it for generating or publishing; stale claims
+    # are handed back by a later sync
+    claimed_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=datetime.now)
 
 
@@ -55,6 +86,28 @@ class CreatePostRequest(BaseModel):
     custom_prompt: Optional[str] = None
     tone: Optional[str] = "professional"
     schedule_at: Optional[datetime] = None
+    bypass_cache: bool = False
+    variation: Optional[str] = None
+    # Images requested from one Imagen call to choose from
+    image_variants: int = Field(1, ge=1, le=4)
+
+
+class CreatePostBatchRequest(BaseModel):
+    posts: List[CreatePostRequest] = Field(min_length=1)
+
+
+class PostBatchItem(BaseModel):
+    index: int
+    # The saved post, or why the item failed
+    post: Optional[Post] = None
+    error: Optional[str] = None
+
+
+class PostBatchResponse(BaseModel):
+    completed: int
+    failed: int
+    # One entry per requested post, in request order
+    results: List[PostBatchItem]
 
 
 class Campaign(BaseModel):
@@ -66,6 +119,7 @@ class Campaign(BaseModel):
     start_date: datetime
     end_date: Optional[datetime] = None
     status: Literal["active", "paused", "completed"] = "active"
+    generation: Literal["eager", "lazy"] = "eager"
     created_at: datetime = Field(default_factory=datetime.now)
 
 
@@ -76,3 +130,27 @@ class CreateCampaignRequest(BaseModel):
     start_date: datetime
     end_date: Optional[datetime] = None
     posts_count: int = Field(ge=1, le=90)
+    # "lazy" only lays out the schedule; each post is generated ahead of its slot
+    generation: Literal["eager", "lazy"] = "eager"
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class Job(BaseModel):
+    id: str
+    kind: Literal["campaign", "post"]
+    status: JobStatus = JobStatus.QUEUED
+    total: int
+    completed: int = 0
+    failed: int = 0
+    # Partial results in slot order; None until that post is finished
+    posts: List[Optional[Post]] = []
+    result_id: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
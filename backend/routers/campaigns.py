@@ -1,105 +1,233 @@
-from fastapi import APIRouter, HTTPException
-from backend.models import Campaign, CreateCampaignRequest, Post, PostStatus
-from backend.services.gemini_service import gemini_service
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from backend.models import (
+    Campaign,
+    CreateCampaignRequest,
+    Job,
+    Post,
+    PostStatus,
+    TemplateType,
+)
+from backend.services.blob_store import release_images
+from backend.services.campaign_service import campaign_service
+from backend.services.job_queue import job_queue
+from backend.services.json_response import (
+    dump_list,
+    etag_matches,
+    json_response,
+    make_etag,
+    not_modified,
+)
+from backend.services.pagination import (
+    DEFAULT_LIMIT,
+    MAX_LIMIT,
+    paginate,
+    paginate_json,
+    parse_cursor,
+    parse_fields,
+)
+from backend.services.repository import repository
+from backend.services.scheduler import scheduler
+from backend.services.streaming import StreamFormat, event_stream
+from datetime import datetime
+from typing import Literal, Optional
 import uuid
 
 router = APIRouter()
 
-# In-memory storage
-campaigns_db = []
+@router.get("/", response_model=None)
+async def get_campaigns(
+    request: Request,
+    response: Response,
+    status: Optional[Literal["active", "paused", "completed"]] = None,
+    template_type: Optional[TemplateType] = None,
+    include_posts: bool = True,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    if_none_match: Optional[str] = Header(None),
+) -> Response:
+    """
+    List campaigns, oldest first
+
+    Set include_posts=false (or leave "posts" out of fields) for lightweight
+    summaries; page through a campaign's posts with GET /{id}/posts. The next
+    page's cursor is returned in the X-Next-Cursor header. Responses carry an
+    ETag; send it as If-None-Match to get a 304 while nothing changed.
+    """
+    projection = parse_fields(fields, Campaign)
+    if projection is not None and "posts" not in projection:
+        include_posts = False
+    elif not include_posts:
+        projection = (projection or set(Campaign.model_fields)) - {"posts"}
+    after = parse_cursor(cursor)
+
+    # Summaries don't depend on posts, so post writes leave their ETag alone
+    revisions = [await repository.revision("campaigns")]
+    if include_posts:
+        revisions.append(await repository.revision("posts"))
+    etag = make_etag(*revisions, request.url.query)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    campaigns = await repository.list_campaigns(
+        status=status,
+        template_type=template_type,
+        after=after,
+        limit=limit + 1,
+        with_posts=include_posts,
+    )
+    body = dump_list(paginate(response, campaigns, limit, projection))
+    return json_response(body, etag, response.headers)
+
+async def build_campaign(request: CreateCampaignRequest, posts: list[Post]) -> Campaign:
+    """Assemble and store a campaign from its generated posts"""
+    if all(post.status == PostStatus.FAILED for post in posts):
+        raise RuntimeError(f"Campaign creation failed: {posts[0].error}")
+
+    campaign = Campaign(
+        id=str(uuid.uuid4()),
+        name=request.name,
+        template_type=request.template_type,
+        posts=posts,
+        frequency=request.frequency,
+        start_date=request.start_date,
+        end_date=request.end_date,
+        status="active",
+        generation=request.generation,
+        created_at=datetime.now()
+    )
+
+    await repository.add_campaign(campaign)
+    scheduler.schedule(campaign.posts)
+    return campaign
+
+
+async def run_campaign_job(job: Job, payload: dict) -> str:
+    """Generate a campaign in the background, reporting each post to the job"""
+    request = CreateCampaignRequest(**payload)
+
+    # Captions and images are generated as a pipeline; failures are per post
+    posts = await campaign_service.generate_posts(
+        request, on_post=lambda index, post: job_queue.report(job, index, post)
+    )
+    return (await build_campaign(request, posts)).id
+
 
-@router.get("/", response_model=list[Campaign])
-async def get_campaigns():
-    """Get all campaigns"""
-    return campaigns_db
+job_queue.register("campaign", run_campaign_job)
 
-@router.post("/", response_model=Campaign)
+@router.post("/", response_model=Job, status_code=202)
 async def create_campaign(request: CreateCampaignRequest):
-    """Create a new campaign with scheduled posts"""
-    try:
-        # Generate content for all posts
-        generated_content = await gemini_service.generate_campaign_posts(
-            template_type=request.template_type,
-            count=request.posts_count,
-            tone="professional"
-        )
-
-        # Calculate posting schedule
-        frequency_map = {
-            "daily": 1,
-            "twice_daily": 2,
-            "three_times_daily": 3
-        }
-        posts_per_day = frequency_map[request.frequency]
-
-        posts = []
-        current_date = request.start_date
-
-        for i, content in enumerate(generated_content):
-            # Calculate scheduled time
-            day_offset = i // posts_per_day
-            post_index_in_day = i % posts_per_day
-
-            scheduled_time = current_date + timedelta(
-                days=day_offset,
-                hours=8 + (post_index_in_day * (12 // posts_per_day))
-            )
-
-            # Create post
-            image_url = await gemini_service.generate_image_url(content["image_prompt"])
-
-            post = Post(
-                id=str(uuid.uuid4()),
-                template_type=request.template_type,
-                caption=content["caption"],
-                image_url=image_url,
-                image_prompt=content["image_prompt"],
-                hashtags=content.get("hashtags", []),
-                scheduled_at=scheduled_time,
-                status=PostStatus.SCHEDULED,
-                created_at=datetime.now()
-            )
-            posts.append(post)
-
-        # Create campaign
-        campaign = Campaign(
-            id=str(uuid.uuid4()),
-            name=request.name,
-            template_type=request.template_type,
-            posts=posts,
-            frequency=request.frequency,
-            start_date=request.start_date,
-            end_date=request.end_date,
-            status="active",
-            created_at=datetime.now()
-        )
-
-        campaigns_db.append(campaign)
-        return campaign
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Campaign creation failed: {str(e)}")
+    """Queue a new campaign; poll GET /api/jobs/{id} for progress"""
+    return await job_queue.submit(
+        "campaign", request.posts_count, request.model_dump(mode="json")
+    )
+
+@router.post("/stream")
+async def stream_campaign(request: CreateCampaignRequest, format: StreamFormat = "sse"):
+    """
+    Create a campaign, streaming each post as soon as it is ready
+
+    Events: "caption" (post without image), "post" (finished post),
+    "progress", then "campaign" (without posts) or "error".
+    """
+
+    async def events():
+        posts: list[Optional[Post]] = [None] * request.posts_count
+        completed = failed = 0
+        try:
+            async for event, index, post in campaign_service.stream_posts(request):
+                yield event, {"index": index, "post": post.model_dump(mode="json")}
+                if event != "post":
+                    continue
+
+                posts[index] = post
+                if post.status == PostStatus.FAILED:
+                    failed += 1
+                else:
+                    completed += 1
+                yield "progress", {
+                    "completed": completed,
+                    "failed": failed,
+                    "total": request.posts_count,
+                }
+
+            campaign = await build_campaign(request, posts)
+            yield "campaign", campaign.model_dump(mode="json", exclude={"posts"})
+        except Exception as e:
+            yield "error", {"detail": str(e)}
+
+    return event_stream(events(), format)
+
+async def campaign_etag(campaign_id: str, *parts) -> str:
+    """ETag for a campaign's views; changes with any campaign or post write"""
+    return make_etag(
+        await repository.revision("campaigns"),
+        await repository.revision("posts"),
+        campaign_id,
+        *parts,
+    )
 
 @router.get("/{campaign_id}", response_model=Campaign)
-async def get_campaign(campaign_id: str):
-    """Get a specific campaign"""
-    campaign = next((c for c in campaigns_db if c.id == campaign_id), None)
+async def get_campaign(campaign_id: str, if_none_match: Optional[str] = Header(None)):
+    """Get a specific campaign (supports ETag/If-None-Match)"""
+    etag = await campaign_etag(campaign_id)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    campaign = await repository.get_campaign(campaign_id)
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
-    return campaign
+    return json_response(campaign.model_dump_json().encode(), etag)
+
+@router.get("/{campaign_id}/posts", response_model=None)
+async def get_campaign_posts(
+    campaign_id: str,
+    request: Request,
+    response: Response,
+    status: Optional[PostStatus] = None,
+    scheduled_from: Optional[datetime] = None,
+    scheduled_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    if_none_match: Optional[str] = Header(None),
+) -> Response:
+    """List a campaign's posts in slot order, paginated like GET /api/posts"""
+    projection = parse_fields(fields, Post)
+    after = parse_cursor(cursor, by_schedule=True)
+    etag = await campaign_etag(campaign_id, request.url.query)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    if not await repository.get_campaign(campaign_id, with_posts=False):
+        raise HTTPException(status_code=404, detail="Campaign not found")
+
+    filters = dict(
+        status=status,
+        scheduled_from=scheduled_from,
+        scheduled_to=scheduled_to,
+        campaign_id=campaign_id,
+        after=after,
+        limit=limit + 1,
+    )
+    if projection is None:
+        body = paginate_json(response, await repository.list_posts_json(**filters), limit)
+    else:
+        posts = await repository.list_posts(**filters)
+        body = dump_list(paginate(response, posts, limit, projection, by_schedule=True))
+    return json_response(body, etag, response.headers)
 
 @router.delete("/{campaign_id}")
 async def delete_campaign(campaign_id: str):
-    """Delete a campaign"""
-    global campaigns_db
-    campaigns_db = [c for c in campaigns_db if c.id != campaign_id]
+    """Delete a campaign with its posts and their images"""
+    campaign = await repository.get_campaign(campaign_id)
+    if campaign and await repository.delete_campaign(campaign_id):
+        await release_images(campaign.posts)
     return {"message": "Campaign deleted successfully"}
 
 @router.patch("/{campaign_id}/status")
 async def update_campaign_status(campaign_id: str, status: str):
     """Update campaign status (active, paused, completed)"""
-    campaign = next((c for c in campaigns_db if c.id == campaign_id), None)
+    campaign = await repository.get_campaign(campaign_id)
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
 
@@ -107,4 +235,8 @@ async def update_campaign_status(campaign_id: str, status: str):
         raise HTTPException(status_code=400, detail="Invalid status")
 
     campaign.status = status
+    await repository.update_campaign(campaign)
+    if status == "active":
+        # Pick up posts that came due while the campaign was paused
+        scheduler.refresh()
     return campaign
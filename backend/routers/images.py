@@ -0,0 +1,104 @@
+import re
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+
+from backend.config import settings
+from backend.services import image_processing
+from backend.services.blob_store import Blob, blob_store, is_valid_key, variant_key
+
+router = APIRouter()
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single-range ``Range`` header into inclusive (start, end)"""
+    match = RANGE_PATTERN.match(range_header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+
+    start, end = match.groups()
+    if start == "":
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end or start >= size:
+        return None
+    return start, end
+
+
+async def get_thumbnail(key: str, width: int) -> Optional[Blob]:
+    """Return a thumbnail variant, rendering and storing it on first use"""
+    content_type = image_processing.FORMATS[settings.image_thumbnail_format][1]
+    thumb_key = variant_key(key, f"w{width}", content_type)
+
+    blob = await blob_store.get(thumb_key)
+    if blob:
+        return blob
+
+    original = await blob_store.get(key)
+    if not original:
+        return None
+
+    data, content_type = await image_processing.make_thumbnail(original.data, width)
+    await blob_store.put(data, content_type, key=thumb_key)
+    return await blob_store.get(thumb_key)
+
+
+@router.get("/{key}")
+async def get_image(
+    key: str,
+    w: Optional[int] = Query(None, description="Thumbnail width"),
+    if_none_match: Optional[str] = Header(None),
+    range: Optional[str] = Header(None),
+):
+    """Serve a stored image (or a thumbnail of it) with ETag and Range support"""
+    if not is_valid_key(key):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    if w is not None:
+        if w not in settings.image_thumbnail_widths:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported width, use one of {settings.image_thumbnail_widths}",
+            )
+        blob = await get_thumbnail(key, w)
+    else:
+        blob = await blob_store.get(key)
+    if not blob:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    etag = f'"{blob.etag}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        # Keys are content addressed, so a URL never changes content
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    size = len(blob.data)
+    if range:
+        byte_range = parse_range(range, size)
+        if byte_range is None:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return Response(
+            content=blob.data[start : end + 1],
+            status_code=206,
+            media_type=blob.content_type,
+            headers=headers,
+        )
+
+    return Response(content=blob.data, media_type=blob.content_type, headers=headers)
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, HTTPException
+
+from backend.models import Job
+from backend.services.job_queue import job_queue
+
+router = APIRouter()
+
+
+@router.get("/{job_id}", response_model=Job)
+async def get_job(job_id: str):
+    """Get job status, per-post progress and partial results"""
+    job = await job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
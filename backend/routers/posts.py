@@ -1,99 +1,560 @@
+import asyncio
 import uuid
+from collections import defaultdict
 from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
 
-from backend.models import CreatePostRequest, GenerateContentRequest, Post, PostStatus
-from backend.services.gemini_service import gemini_service
+from backend.config import settings
+from backend.models import (
+    CreatePostBatchRequest,
+    CreatePostRequest,
+    GenerateContentRequest,
+    Job,
+    Post,
+    PostBatchItem,
+    PostBatchResponse,
+    PostStatus,
+    TemplateType,
+)
+from backend.services.blob_store import release_images
+from backend.services.campaign_service import PostCallback
+from backend.services.gemini_service import GeminiService, get_gemini_service
+from backend.services.job_queue import job_queue
+from backend.services.json_response import (
+    dump_list,
+    etag_matches,
+    json_response,
+    make_etag,
+    not_modified,
+)
+from backend.services.pagination import (
+    DEFAULT_LIMIT,
+    MAX_LIMIT,
+    paginate,
+    paginate_json,
+    parse_cursor,
+    parse_fields,
+)
+from backend.services.repository import repository
+from backend.services.scheduler import scheduler
+from backend.services.streaming import StreamFormat, event_stream
+from backend.services.tracing import logger, tracer
+from backend.services.upstream import UpstreamUnavailableError
 
 router = APIRouter()
 
-# In-memory storage (replace with database in production)
-posts_db = []
+@router.get("/", response_model=None)
+async def get_posts(
+    request: Request,
+    response: Response,
+    status: Optional[PostStatus] = None,
+    template_type: Optional[TemplateType] = None,
+    scheduled_from: Optional[datetime] = None,
+    scheduled_to: Optional[datetime] = None,
+    campaign_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    if_none_match: Optional[str] = Header(None),
+) -> Response:
+    """
+    List posts, oldest first
 
+    Without ``campaign_id`` only standalone posts are listed. The next page's
+    cursor is returned in the X-Next-Cursor header. Responses carry an ETag
+    that changes with any post; send it as If-None-Match to get a 304.
+    """
+    projection = parse_fields(fields, Post)
+    after = parse_cursor(cursor, by_schedule=campaign_id is not None)
+    # Read before listing: if a write lands in between, the next poll refetches
+    etag = make_etag(await repository.revision("posts"), request.url.query)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
 
-@router.get("/", response_model=list[Post])
-async def get_posts():
-    """Get all posts"""
-    return posts_db
+    filters = dict(
+        status=status,
+        template_type=template_type,
+        scheduled_from=scheduled_from,
+        scheduled_to=scheduled_to,
+        campaign_id=campaign_id,
+        standalone=campaign_id is None,
+        after=after,
+        limit=limit + 1,
+    )
+    if projection is None:
+        body = paginate_json(response, await repository.list_posts_json(**filters), limit)
+    else:
+        posts = await repository.list_posts(**filters)
+        body = dump_list(
+            paginate(response, posts, limit, projection, by_schedule=campaign_id is not None)
+        )
+    return json_response(body, etag, response.headers)
 
 
 @router.post("/generate")
-async def generate_content(request: GenerateContentRequest):
+async def generate_content(
+    request: GenerateContentRequest,
+    gemini: GeminiService = Depends(get_gemini_service),
+):
     """Generate content using Gemini AI"""
     try:
-        content = await gemini_service.generate_caption(
+        content = await gemini.generate_caption(
             template_type=request.template_type,
             custom_prompt=request.custom_prompt,
             tone=request.tone or "professional",
+            bypass_cache=request.bypass_cache,
+            variation=request.variation,
         )
         return content
+    except UpstreamUnavailableError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Content generation failed: {str(e)}"
         )
 
 
-@router.post("/", response_model=Post)
-async def create_post(request: CreatePostRequest):
-    """Create a new post"""
-    try:
-        # Generate content
-        content = await gemini_service.generate_caption(
+@router.post("/generate/stream")
+async def stream_content(
+    request: GenerateContentRequest,
+    format: StreamFormat = "sse",
+    image: bool = Query(False, description="Also generate the image from the image prompt"),
+):
+    """
+    Generate content, streaming each field as soon as the model finishes it
+
+    Events: "caption", "hashtags" and "image_prompt" (in the order the model
+    writes them), then "content" with the full result, as POST /generate
+    returns it. With ``image=true`` the image starts as soon as the image
+    prompt is final and an "image" event follows. Failures end the stream
+    with "error".
+    """
+    events: asyncio.Queue = asyncio.Queue()
+    gemini = get_gemini_service()
+    image_job: Optional[asyncio.Task] = None
+
+    async def on_field(field: str, value):
+        nonlocal image_job
+        await events.put((field, {field: value}))
+        if field == "image_prompt" and image and image_job is None:
+            # Don't wait for the rest of the caption stream
+            image_job = asyncio.create_task(gemini.generate_image_url(value))
+
+    async def run():
+        try:
+            content = await gemini.generate_caption(
+                template_type=request.template_type,
+                custom_prompt=request.custom_prompt,
+                tone=request.tone or "professional",
+                bypass_cache=request.bypass_cache,
+                variation=request.variation,
+                on_field=on_field,
+            )
+            await events.put(("content", content))
+            if image_job:
+                await events.put(("image", {"image_url": await image_job}))
+        except Exception as e:
+            await events.put(("error", {"detail": str(e)}))
+        await events.put(None)
+
+    async def stream():
+        task = asyncio.create_task(run())
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+        finally:
+            task.cancel()
+            if image_job:
+                image_job.cancel()
+
+    return event_stream(stream(), format)
+
+
+async def generate_post(
+    request: CreatePostRequest, on_caption: Optional[PostCallback] = None
+) -> Post:
+    """
+    Generate caption and image for a single post
+
+    Args:
+        request: The post to generate
+        on_caption: Optional callback invoked with the post (without its
+            image) as soon as the caption is ready
+    """
+    with tracer.start_as_current_span(
+        "generate_post", attributes={"template.type": request.template_type.value}
+    ):
+        gemini = get_gemini_service()
+        content = await gemini.generate_caption(
             template_type=request.template_type,
             custom_prompt=request.custom_prompt,
             tone=request.tone or "professional",
+            bypass_cache=request.bypass_cache,
+            variation=request.variation,
         )
 
-        # Generate image URL (placeholder for now)
-        image_url = await gemini_service.generate_image_url(content["image_prompt"])
+        post = new_post(request, content)
+        if on_caption:
+            await on_caption(0, post.model_copy())
+
+        await attach_image(post, request.image_variants)
+        return post
+
+
+def new_post(request: CreatePostRequest, content: Dict[str, Any]) -> Post:
+    """A post for ``request`` from its generated caption, still without image"""
+    return Post(
+        id=str(uuid.uuid4()),
+        template_type=request.template_type,
+        caption=content["caption"],
+        image_prompt=content["image_prompt"],
+        hashtags=content.get("hashtags", []),
+        scheduled_at=request.schedule_at,
+        status=PostStatus.SCHEDULED if request.schedule_at else PostStatus.DRAFT,
+        created_at=datetime.now(),
+    )
+
+
+async def attach_image(post: Post, variants: int = 1) -> None:
+    """Generate and store the post's image; failures raise rather than save a placeholder"""
+    gemini = get_gemini_service()
+    if variants > 1:
+        post.image_variants = await gemini.generate_image_variants(post.image_prompt, variants)
+        post.image_url = post.image_variants[0].url
+    else:
+        post.image_url = await gemini.generate_image_url(post.image_prompt)
 
-        # Create post
-        post = Post(
-            id=str(uuid.uuid4()),
-            template_type=request.template_type,
-            caption=content["caption"],
-            image_url=image_url,
-            image_prompt=content["image_prompt"],
-            hashtags=content.get("hashtags", []),
-            scheduled_at=request.schedule_at,
-            status=PostStatus.SCHEDULED if request.schedule_at else PostStatus.DRAFT,
-            created_at=datetime.now(),
-        )
 
-        posts_db.append(post)
+# Called with (item index, saved post or the exception that failed the item)
+BatchCallback = Callable[[int, Union[Post, Exception]], Awaitable[None]]
+
+
+def group_requests(requests: List[CreatePostRequest]) -> List[List[int]]:
+    """
+    Indices of the batch items that can share caption calls
+
+    Items with the same template, custom prompt and tone form one group and
+    are asked for as distinct posts; an item with a ``variation`` label is
+    generated on its own, exactly like POST /api/posts.
+    """
+    groups: Dict[tuple, List[int]] = defaultdict(list)
+    singles = []
+    for index, request in enumerate(requests):
+        if request.variation:
+            singles.append([index])
+        else:
+            key = (request.template_type, request.custom_prompt, request.tone or "professional")
+            groups[key].append(index)
+    return list(groups.values()) + singles
+
+
+async def generate_post_batch(
+    requests: List[CreatePostRequest], on_item: Optional[BatchCallback] = None
+) -> List[Union[Post, Exception]]:
+    """
+    Generate and save a batch of posts as one pipeline
+
+    Captions of grouped items are requested ``campaign_batch_size`` at a
+    time; each image starts as soon as its caption is ready. Both stages are
+    bounded across the whole batch, and a failure only affects its item.
+
+    Returns:
+        One saved post, or the exception that failed it, per request
+    """
+    gemini = get_gemini_service()
+    caption_semaphore = asyncio.Semaphore(settings.post_batch_caption_concurrency)
+    image_semaphore = asyncio.Semaphore(settings.post_batch_image_concurrency)
+    results: List[Union[Post, Exception, None]] = [None] * len(requests)
+
+    async def finish(index: int, content: Union[Dict[str, Any], Exception]):
+        result = content
+        if not isinstance(content, Exception):
+            post = new_post(requests[index], content)
+            try:
+                async with image_semaphore:
+                    await attach_image(post, requests[index].image_variants)
+                await repository.add_post(post)
+                scheduler.schedule([post])
+                result = post
+            except Exception as e:
+                result = e
+        if isinstance(result, Exception):
+            logger.warning(
+                "Batch post failed: %s",
+                result,
+                extra={"template_type": requests[index].template_type.value, "post_index": index},
+            )
+        results[index] = result
+        if on_item:
+            await on_item(index, result)
+
+    async def caption_one(index: int, bypass_cache: bool, variation: Optional[str]):
+        request = requests[index]
+        try:
+            async with caption_semaphore:
+                content = await gemini.generate_caption(
+                    template_type=request.template_type,
+                    custom_prompt=request.custom_prompt,
+                    tone=request.tone or "professional",
+                    bypass_cache=bypass_cache,
+                    variation=variation,
+                )
+        except Exception as e:
+            content = e
+        await finish(index, content)
+
+    async def caption_chunk(indices: List[int], start: int, total: int):
+        request = requests[indices[0]]
+        try:
+            async with caption_semaphore:
+                contents = await gemini.generate_caption_batch(
+                    request.template_type,
+                    start,
+                    len(indices),
+                    total,
+                    request.tone or "professional",
+                    custom_prompt=request.custom_prompt,
+                )
+        except Exception as e:
+            contents = [e] * len(indices)
+
+        jobs = []
+        for offset, (index, content) in enumerate(zip(indices, contents)):
+            if content is None:
+                # Failed validation: ask for just this post
+                variation = f"{start + offset + 1} of {total}"
+                jobs.append(caption_one(index, True, variation))
+            else:
+                jobs.append(finish(index, content))
+        await asyncio.gather(*jobs)
+
+    groups = group_requests(requests)
+    size = max(settings.campaign_batch_size, 1)
+    tasks = []
+    for group in groups:
+        if len(group) == 1 or size == 1:
+            for index in group:
+                request = requests[index]
+                tasks.append(caption_one(index, request.bypass_cache, request.variation))
+            continue
+        for start in range(0, len(group), size):
+            tasks.append(caption_chunk(group[start : start + size], start, len(group)))
+
+    with tracer.start_as_current_span(
+        "generate_post_batch",
+        attributes={"post.count": len(requests), "batch.groups": len(groups)},
+    ):
+        tasks = [asyncio.create_task(task) for task in tasks]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+    return results
+
+
+async def run_post_job(job: Job, payload: dict) -> str:
+    """Generate a post in the background"""
+    post = await generate_post(CreatePostRequest(**payload))
+    await repository.add_post(post)
+    scheduler.schedule([post])
+    await job_queue.report(job, 0, post)
+    return post.id
+
+
+job_queue.register("post", run_post_job)
+
+
+@router.post("/", response_model=Post)
+async def create_post(request: CreatePostRequest):
+    """Create a new post"""
+    try:
+        post = await generate_post(request)
+        await repository.add_post(post)
+        scheduler.schedule([post])
         return post
 
+    except UpstreamUnavailableError:
+        raise
     except Exception as e:
-        import traceback
-        print(f"ERROR: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception(
+            "Post creation failed", extra={"template_type": request.template_type.value}
+        )
         raise HTTPException(status_code=500, detail=f"Post creation failed: {str(e)}")
 
 
+def batch_item(index: int, result: Union[Post, Exception]) -> PostBatchItem:
+    if isinstance(result, Exception):
+        return PostBatchItem(index=index, error=str(result))
+    return PostBatchItem(index=index, post=result)
+
+
+def check_batch_size(request: CreatePostBatchRequest) -> None:
+    if len(request.posts) > settings.post_batch_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.post_batch_max_items} posts per batch",
+        )
+
+
+@router.post("/batch", response_model=PostBatchResponse)
+async def create_post_batch(request: CreatePostBatchRequest):
+    """
+    Create many posts, possibly of different templates, in one request
+
+    Compatible items share caption calls and the whole batch is generated
+    with bounded concurrency. Every successful post is saved; failures are
+    reported per item instead of failing the request.
+    """
+    check_batch_size(request)
+    results = await generate_post_batch(request.posts)
+    items = [batch_item(index, result) for index, result in enumerate(results)]
+    failed = sum(item.error is not None for item in items)
+    return PostBatchResponse(completed=len(items) - failed, failed=failed, results=items)
+
+
+@router.post("/batch/stream")
+async def stream_post_batch(request: CreatePostBatchRequest, format: StreamFormat = "sse"):
+    """
+    Create a batch of posts, streaming each item as soon as it is finished
+
+    Events: "item" (index with post or error) in completion order, then
+    "done" with the completed and failed counts.
+    """
+    check_batch_size(request)
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def on_item(index: int, result: Union[Post, Exception]):
+        await events.put(("item", batch_item(index, result).model_dump(mode="json")))
+
+    async def run():
+        try:
+            results = await generate_post_batch(request.posts, on_item=on_item)
+            failed = sum(isinstance(result, Exception) for result in results)
+            await events.put(
+                ("done", {"completed": len(results) - failed, "failed": failed})
+            )
+        except Exception as e:
+            await events.put(("error", {"detail": str(e)}))
+        await events.put(None)
+
+    async def stream():
+        task = asyncio.create_task(run())
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+        finally:
+            task.cancel()
+
+    return event_stream(stream(), format)
+
+
+@router.post("/jobs", response_model=Job, status_code=202)
+async def create_post_job(request: CreatePostRequest):
+    """Queue a new post; poll GET /api/jobs/{id} for the result"""
+    return await job_queue.submit("post", 1, request.model_dump(mode="json"))
+
+
+@router.post("/stream")
+async def stream_post(request: CreatePostRequest, format: StreamFormat = "sse"):
+    """
+    Create a post, streaming the caption before the image is ready
+
+    Events: "caption" (post without image), then "post" or "error".
+    """
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def on_caption(index: int, post: Post):
+        await events.put(("caption", post.model_dump(mode="json")))
+
+    async def run():
+        try:
+            post = await generate_post(request, on_caption=on_caption)
+            await repository.add_post(post)
+            scheduler.schedule([post])
+            await events.put(("post", post.model_dump(mode="json")))
+        except Exception as e:
+            await events.put(("error", {"detail": str(e)}))
+        await events.put(None)
+
+    async def stream():
+        task = asyncio.create_task(run())
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+        finally:
+            task.cancel()
+
+    return event_stream(stream(), format)
+
+
 @router.get("/{post_id}", response_model=Post)
-async def get_post(post_id: str):
-    """Get a specific post"""
-    post = next((p for p in posts_db if p.id == post_id), None)
+async def get_post(post_id: str, if_none_match: Optional[str] = Header(None)):
+    """Get a specific post (supports ETag/If-None-Match)"""
+    body = await repository.get_post_json(post_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    etag = make_etag(body)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return json_response(body, etag)
+
+
+@router.post("/{post_id}/generate", response_model=Post)
+async def generate_campaign_post(post_id: str):
+    """
+    Generate a lazy campaign post now instead of waiting for its lead window
+
+    Also regenerates campaign posts that failed.
+    """
+    post = await repository.get_post(post_id)
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    if not post.campaign_id or post.status not in (PostStatus.PENDING, PostStatus.FAILED):
+        raise HTTPException(status_code=409, detail=f"Post is {post.status.value}")
+
+    generated = await scheduler.generate(post_id, post.status)
+    if generated is None:
+        raise HTTPException(status_code=409, detail="Post is already being generated")
+    return generated
+
+
+@router.patch("/{post_id}/image", response_model=Post)
+async def select_image_variant(post_id: str, variant: int = Query(ge=0)):
+    """Use another of the post's image variants as its image"""
+    post = await repository.get_post(post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
+    if variant >= len(post.image_variants):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Post has {len(post.image_variants)} image variants",
+        )
+
+    post.image_url = post.image_variants[variant].url
+    await repository.update_post(post)
     return post
 
 
 @router.delete("/{post_id}")
 async def delete_post(post_id: str):
-    """Delete a post"""
-    global posts_db
-    posts_db = [p for p in posts_db if p.id != post_id]
+    """Delete a post and its images, unless another post uses them"""
+    post = await repository.get_post(post_id)
+    if post and await repository.delete_post(post_id):
+        await release_images([post])
     return {"message": "Post deleted successfully"}
 
 
 @router.patch("/{post_id}/status")
 async def update_post_status(post_id: str, status: PostStatus):
     """Update post status"""
-    post = next((p for p in posts_db if p.id == post_id), None)
+    post = await repository.get_post(post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
     post.status = status
+    await repository.update_post(post)
+    scheduler.schedule([post])
     return post
@@ -1,5 +1,10 @@
-from fastapi import APIRouter
+from typing import Optional
+
+from fastapi import APIRouter, Header
+from pydantic import TypeAdapter
+
 from backend.models import Template, TemplateType
+from backend.services.json_response import etag_matches, json_response, make_etag, not_modified
 
 router = APIRouter()
 
@@ -56,15 +61,25 @@ TEMPLATES = [
     ),
 ]
 
+# Templates never change at runtime: serialize them once
+TEMPLATES_JSON = TypeAdapter(list[Template]).dump_json(TEMPLATES)
+TEMPLATES_ETAG = make_etag(TEMPLATES_JSON)
+TEMPLATE_JSON = {t.id: t.model_dump_json().encode() for t in TEMPLATES}
+
 @router.get("/", response_model=list[Template])
-async def get_templates():
+async def get_templates(if_none_match: Optional[str] = Header(None)):
     """Get all available templates"""
-    return TEMPLATES
+    if etag_matches(if_none_match, TEMPLATES_ETAG):
+        return not_modified(TEMPLATES_ETAG)
+    return json_response(TEMPLATES_JSON, TEMPLATES_ETAG)
 
 @router.get("/{template_id}", response_model=Template)
-async def get_template(template_id: str):
+async def get_template(template_id: str, if_none_match: Optional[str] = Header(None)):
     """Get a specific template by ID"""
-    template = next((t for t in TEMPLATES if t.id == template_id), None)
-    if not template:
+    body = TEMPLATE_JSON.get(template_id)
+    if body is None:
         return {"error": "Template not found"}
-    return template
+    etag = make_etag(body)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return json_response(body, etag)
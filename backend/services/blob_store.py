@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import os
+import re
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from backend.config import settings
+from backend.models import Post
+from backend.services.repository import image_keys, repository
+from backend.services.tracing import logger
+
+EXTENSIONS = {
+    "image/png": "png",
+    "image/jpeg": "jpg",
+    "image/webp": "webp",
+}
+CONTENT_TYPES = {ext: content_type for content_type, ext in EXTENSIONS.items()}
+
+# Keys are content addressed: sha256 hex digest, an optional variant suffix
+# (e.g. "_w256" for thumbnails) and a file extension
+KEY_PATTERN = re.compile(r"^[0-9a-f]{64}(_[a-z0-9]+)?\.[a-z0-9]+$")
+
+
+@dataclass
+class Blob:
+    data: bytes
+    content_type: str
+    etag: str
+
+
+def make_key(data: bytes, content_type: str) -> str:
+    """Content-addressed key, so identical images are stored once"""
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{digest}.{EXTENSIONS.get(content_type, 'bin')}"
+
+
+def variant_key(key: str, variant: str, content_type: str) -> str:
+    """Key of a derived variant (such as a thumbnail) of a stored blob"""
+    digest = key.split(".")[0].split("_")[0]
+    return f"{digest}_{variant}.{EXTENSIONS.get(content_type, 'bin')}"
+
+
+def is_valid_key(key: str) -> bool:
+    return bool(KEY_PATTERN.match(key))
+
+
+def content_type_for(key: str) -> str:
+    return CONTENT_TYPES.get(key.rsplit(".", 1)[-1], "application/octet-stream")
+
+
+class BlobStore(ABC):
+    """Storage for generated media, addressed by short keys"""
+
+    @abstractmethod
+    async def put(
+        self, data: bytes, content_type: str, key: Optional[str] = None
+    ) -> str:
+        """Store data under a content-addressed (or given) key and return it"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Blob]:
+        """Return the blob for a key, or None if it doesn't exist"""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove a blob if it exists"""
+
+    def url_for(self, key: str) -> str:
+        """Public URL that serves the blob through the images endpoint"""
+        base_url = (settings.public_base_url or "").rstrip("/")
+        return f"{base_url}/api/images/{key}"
+
+
+class LocalBlobStore(BlobStore):
+    """Stores blobs as files in a local directory"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _write(self, key: str, data: bytes) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        # Write then rename so readers never see a partial file; the temp name
+        # is unique so concurrent writers (threads or workers) don't share it
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _read(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    async def put(
+        self, data: bytes, content_type: str, key: Optional[str] = None
+    ) -> str:
+        key = key or make_key(data, content_type)
+        await asyncio.to_thread(self._write, key, data)
+        return key
+
+    async def get(self, key: str) -> Optional[Blob]:
+        data = await asyncio.to_thread(self._read, key)
+        if data is None:
+            return None
+        return Blob(data=data, content_type=content_type_for(key), etag=key.split(".")[0])
+
+    async def delete(self, key: str) -> None:
+        try:
+            await asyncio.to_thread(os.remove, self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3BlobStore(BlobStore):
+    """Stores blobs in an S3-compatible bucket (AWS S3, MinIO, R2, GCS interop)"""
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        prefix: str = "",
+    ):
+        try:
+            import boto3
+        except ImportError as e:
+            raise RuntimeError("S3 blob store requires boto3 (pip install boto3)") from e
+
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _get(self, key: str) -> Optional[bytes]:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return response["Body"].read()
+
+    async def put(
+        self, data: bytes, content_type: str, key: Optional[str] = None
+    ) -> str:
+        key = key or make_key(data, content_type)
+        await asyncio.to_thread(
+            self.client.put_object,
+            Bucket=self.bucket,
+            Key=self.prefix + key,
+            Body=data,
+            ContentType=content_type,
+        )
+        return key
+
+    async def get(self, key: str) -> Optional[Blob]:
+        data = await asyncio.to_thread(self._get, key)
+        if data is None:
+            return None
+        return Blob(data=data, content_type=content_type_for(key), etag=key.split(".")[0])
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(
+            self.client.delete_object, Bucket=self.bucket, Key=self.prefix + key
+        )
+
+
+def get_blob_store(name: str) -> BlobStore:
+    """Create the blob store configured by ``settings.blob_store``"""
+    if name == "local":
+        return LocalBlobStore(settings.blob_store_dir)
+    if name == "s3":
+        return S3BlobStore(
+            bucket=settings.s3_bucket,
+            endpoint_url=settings.s3_endpoint_url,
+            region=settings.s3_region,
+            prefix=settings.s3_prefix,
+        )
+    raise ValueError(f"Unknown blob store: {name}")
+
+
+blob_store = get_blob_store(settings.blob_store)
+
+
+async def release_images(posts: Iterable[Post]) -> None:
+    """
+    Delete the image blobs of deleted posts once no other post uses them
+
+    Keys are content addressed, so one blob can back several posts; it is
+    only removed when the repository has no reference left, together with
+    its thumbnails.
+    """
+    keys = set()
+    for post in posts:
+        keys |= image_keys(post)
+    for key in keys:
+        if not is_valid_key(key) or await repository.image_in_use(key):
+            continue
+        thumbnails = [
+            variant_key(key, f"w{width}", content_type)
+            for width in settings.image_thumbnail_widths
+            for content_type in EXTENSIONS
+        ]
+        try:
+            for blob_key in [key, *thumbnails]:
+                await blob_store.delete(blob_key)
+        except Exception:
+            logger.warning("Could not delete image", exc_info=True, extra={"blob_key": key})
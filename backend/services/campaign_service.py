@@ -0,0 +1,242 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from backend.config import settings
+from backend.models import CreateCampaignRequest, Post, PostStatus, TemplateType
+from backend.services.gemini_service import get_gemini_service
+from backend.services.tracing import tracer
+
+FREQUENCY_POSTS_PER_DAY = {
+    "daily": 1,
+    "twice_daily": 2,
+    "three_times_daily": 3,
+}
+
+# Called with (slot index, post) as soon as a post is finished
+PostCallback = Callable[[int, Post], Awaitable[None]]
+
+
+def schedule_slots(start_date: datetime, frequency: str, count: int) -> List[datetime]:
+    """Calculate the posting time for each slot of a campaign"""
+    posts_per_day = FREQUENCY_POSTS_PER_DAY[frequency]
+    slots = []
+
+    for i in range(count):
+        day_offset = i // posts_per_day
+        post_index_in_day = i % posts_per_day
+        slots.append(
+            start_date
+            + timedelta(
+                days=day_offset,
+                hours=8 + (post_index_in_day * (12 // posts_per_day)),
+            )
+        )
+
+    return slots
+
+
+class CampaignService:
+    def __init__(
+        self,
+        caption_concurrency: Optional[int] = None,
+        image_concurrency: Optional[int] = None,
+    ):
+        self.caption_concurrency = (
+            caption_concurrency or settings.campaign_caption_concurrency
+        )
+        self.image_concurrency = image_concurrency or settings.campaign_image_concurrency
+
+    async def _build_post(
+        self,
+        index: int,
+        template_type: TemplateType,
+        content: Dict[str, Any],
+        scheduled_at: datetime,
+        semaphore: asyncio.Semaphore,
+        on_post: Optional[PostCallback] = None,
+        on_caption: Optional[PostCallback] = None,
+    ) -> Post:
+        """Generate the image for a finished caption and assemble the post"""
+        post = Post(
+            id=str(uuid.uuid4()),
+            template_type=template_type,
+            caption=content["caption"],
+            image_prompt=content["image_prompt"],
+            hashtags=content.get("hashtags", []),
+            scheduled_at=scheduled_at,
+            status=PostStatus.SCHEDULED,
+            created_at=datetime.now(),
+        )
+        if on_caption:
+            await on_caption(index, post.model_copy())
+
+        with tracer.start_as_current_span("campaign_image", attributes={"post.index": index}):
+            try:
+                async with semaphore:
+                    post.image_url = await get_gemini_service().generate_image_url(
+                        content["image_prompt"]
+                    )
+            except Exception as e:
+                post.status = PostStatus.FAILED
+                post.error = f"Image generation failed: {str(e)}"
+
+        if on_post:
+            await on_post(index, post)
+        return post
+
+    def layout_posts(self, request: CreateCampaignRequest) -> List[Post]:
+        """Create the empty, PENDING slots of a lazy campaign"""
+        return [
+            Post(
+                id=str(uuid.uuid4()),
+                template_type=request.template_type,
+                caption="",
+                scheduled_at=scheduled_at,
+                status=PostStatus.PENDING,
+                created_at=datetime.now(),
+            )
+            for scheduled_at in schedule_slots(
+                request.start_date, request.frequency, request.posts_count
+            )
+        ]
+
+    async def fill_post(self, post: Post) -> Post:
+        """
+        Generate caption and image for a lazily created slot
+
+        The post becomes SCHEDULED, or FAILED if its image can't be generated.
+        Caption errors are raised so the slot can be retried later.
+        """
+        variation_prompt = (
+            f"Create the post for {post.scheduled_at:%A, %B %d}. Make it unique and engaging."
+        )
+        with tracer.start_as_current_span(
+            "fill_post",
+            attributes={"post.id": post.id, "campaign.id": post.campaign_id or ""},
+        ):
+            # Campaign posts are meant to differ, so never serve them from cache
+            content = await get_gemini_service().generate_caption(
+                post.template_type, variation_prompt, "professional", bypass_cache=True
+            )
+            post.caption = content["caption"]
+            post.image_prompt = content["image_prompt"]
+            post.hashtags = content.get("hashtags", [])
+            post.status = PostStatus.SCHEDULED
+            post.error = None
+
+            try:
+                post.image_url = await get_gemini_service().generate_image_url(
+                    content["image_prompt"]
+                )
+            except Exception as e:
+                post.status = PostStatus.FAILED
+                post.error = f"Image generation failed: {str(e)}"
+        return post
+
+    async def generate_posts(
+        self,
+        request: CreateCampaignRequest,
+        on_post: Optional[PostCallback] = None,
+        on_caption: Optional[PostCallback] = None,
+    ) -> List[Post]:
+        """
+        Generate every post of a campaign as a pipeline
+
+        Captions are generated concurrently and each image job starts as soon
+        as its caption is ready. Posts keep their slot order, and a failure
+        only marks the affected post as FAILED. Lazy campaigns only get their
+        PENDING slots here; the scheduler fills them ahead of time.
+
+        Args:
+            request: The campaign to generate posts for
+            on_post: Optional progress callback invoked for each finished post
+            on_caption: Optional callback invoked with each post (without its
+                image) as soon as its caption is ready
+        """
+        if request.generation == "lazy":
+            posts = self.layout_posts(request)
+            if on_post:
+                for index, post in enumerate(posts):
+                    await on_post(index, post)
+            return posts
+
+        slots = schedule_slots(request.start_date, request.frequency, request.posts_count)
+        posts: List[Optional[Post]] = [None] * request.posts_count
+        image_semaphore = asyncio.Semaphore(self.image_concurrency)
+        image_jobs: Dict[int, asyncio.Task] = {}
+
+        try:
+            async for index, content in get_gemini_service().generate_campaign_posts(
+                template_type=request.template_type,
+                count=request.posts_count,
+                tone="professional",
+                concurrency=self.caption_concurrency,
+            ):
+                if isinstance(content, Exception):
+                    posts[index] = Post(
+                        id=str(uuid.uuid4()),
+                        template_type=request.template_type,
+                        caption="",
+                        scheduled_at=slots[index],
+                        status=PostStatus.FAILED,
+                        error=f"Caption generation failed: {str(content)}",
+                        created_at=datetime.now(),
+                    )
+                    if on_post:
+                        await on_post(index, posts[index])
+                    continue
+
+                image_jobs[index] = asyncio.create_task(
+                    self._build_post(
+                        index,
+                        request.template_type,
+                        content,
+                        slots[index],
+                        image_semaphore,
+                        on_post,
+                        on_caption,
+                    )
+                )
+
+            for index, job in image_jobs.items():
+                posts[index] = await job
+        finally:
+            for job in image_jobs.values():
+                job.cancel()
+
+        return posts
+
+    async def stream_posts(
+        self, request: CreateCampaignRequest
+    ) -> AsyncIterator[Tuple[str, int, Post]]:
+        """
+        Run the pipeline and yield ("caption" | "post", index, post) events
+
+        A "caption" event carries a post whose image is still being generated;
+        the matching "post" event carries the finished post.
+        """
+        events: asyncio.Queue = asyncio.Queue()
+
+        async def on_caption(index: int, post: Post):
+            await events.put(("caption", index, post))
+
+        async def on_post(index: int, post: Post):
+            await events.put(("post", index, post))
+
+        task = asyncio.create_task(
+            self.generate_posts(request, on_post=on_post, on_caption=on_caption)
+        )
+        task.add_done_callback(lambda _: events.put_nowait(None))
+
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+            # Surface pipeline errors to the consumer
+            await task
+        finally:
+            task.cancel()
+
+
+campaign_service = CampaignService()
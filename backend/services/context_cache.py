@@ -0,0 +1,224 @@
+import asyncio
+import hashlib
+import itertools
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from backend.config import settings
+from backend.services.singleflight import SingleFlight
+from backend.services.tracing import logger
+from backend.services.upstream import estimate_tokens
+
+
+@dataclass
+class CachedPrefix:
+    name: str
+    digest: str
+    expires_at: float
+
+
+class ContextCache(ABC):
+    """
+    Server-side cached content for static prompt prefixes
+
+    ``get`` returns the name of a cached-content entry holding the prefix,
+    creating it on first use, refreshing its TTL when it is about to expire
+    and replacing it when the prefix changes (e.g. after a prompt reload).
+    It returns None whenever caching isn't possible, and callers then send
+    the full prompt; a failed create is not retried for a while.
+    """
+
+    def __init__(self, ttl: int, refresh_margin: int, min_tokens: int):
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.min_tokens = min_tokens
+        self.entries: Dict[Tuple[str, str], CachedPrefix] = {}
+        self.failed_until: Dict[Tuple[str, str], float] = {}
+        self.inflight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.refreshed = 0
+        self.failures = 0
+
+    @abstractmethod
+    async def _create(self, model: str, prefix: str, display_name: str) -> Tuple[str, float]:
+        """Create an entry, returning its name and expiry timestamp"""
+
+    @abstractmethod
+    async def _refresh(self, name: str) -> float:
+        """Extend an entry's TTL, returning its new expiry timestamp"""
+
+    @abstractmethod
+    async def _delete(self, name: str) -> None:
+        """Delete an entry"""
+
+    async def get(self, model: str, key: str, prefix: str) -> Optional[str]:
+        """
+        Name of the cached content holding ``prefix``, or None to send it inline
+
+        Args:
+            model: Model the entry is created for (entries are per model)
+            key: Stable identifier of the prefix, such as the template name
+            prefix: The prefix text
+        """
+        if estimate_tokens(prefix) < self.min_tokens:
+            # Below the API's minimum cacheable size
+            return None
+
+        slot = (model, key)
+        now = time.time()
+        if self.failed_until.get(slot, 0) > now:
+            self.misses += 1
+            return None
+
+        digest = hashlib.sha256(prefix.encode()).hexdigest()
+        entry = self.entries.get(slot)
+        if entry and entry.digest == digest and entry.expires_at - now > self.refresh_margin:
+            self.hits += 1
+            return entry.name
+
+        try:
+            entry = await self.inflight.do(
+                f"{model}\n{key}\n{digest}", lambda: self._ensure(slot, digest, prefix)
+            )
+        except Exception as e:
+            self.failures += 1
+            self.misses += 1
+            self.failed_until[slot] = time.time() + self.refresh_margin
+            logger.warning(
+                "Context cache unavailable: %s", e, extra={"model": model, "cache_key": key}
+            )
+            return None
+
+        self.hits += 1
+        return entry.name
+
+    async def _ensure(self, slot: Tuple[str, str], digest: str, prefix: str) -> CachedPrefix:
+        model, key = slot
+        entry = self.entries.get(slot)
+        if entry and entry.digest == digest:
+            try:
+                entry.expires_at = await self._refresh(entry.name)
+                self.refreshed += 1
+                return entry
+            except Exception:
+                # Expired or deleted upstream: create a new one below
+                self.entries.pop(slot, None)
+        elif entry:
+            # The prompt changed; drop the stale entry
+            await self.invalidate(model, key)
+
+        name, expires_at = await self._create(model, prefix, f"orchestrator-{key}-{digest[:8]}")
+        self.created += 1
+        entry = CachedPrefix(name, digest, expires_at)
+        self.entries[slot] = entry
+        return entry
+
+    async def invalidate(self, model: str, key: str) -> None:
+        """Forget (and delete upstream) the entry for a prefix"""
+        entry = self.entries.pop((model, key), None)
+        if entry:
+            try:
+                await self._delete(entry.name)
+            except Exception:
+                pass
+
+    async def close(self) -> None:
+        """Delete every entry created by this process"""
+        await asyncio.gather(
+            *(self.invalidate(model, key) for model, key in list(self.entries)),
+            return_exceptions=True,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "created": self.created,
+            "refreshed": self.refreshed,
+            "failures": self.failures,
+        }
+
+
+class GeminiContextCache(ContextCache):
+    """Entries managed through ``client.aio.caches`` of the google-genai SDK"""
+
+    def __init__(self, client: Callable[[], Any], ttl: int, refresh_margin: int, min_tokens: int):
+        super().__init__(ttl, refresh_margin, min_tokens)
+        self.client = client
+
+    def _expiry(self, cached) -> float:
+        expire_time = getattr(cached, "expire_time", None)
+        return expire_time.timestamp() if expire_time else time.time() + self.ttl
+
+    async def _create(self, model: str, prefix: str, display_name: str) -> Tuple[str, float]:
+        from google.genai import types
+
+        cached = await self.client().aio.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                contents=[types.Content(role="user", parts=[types.Part.from_text(text=prefix)])],
+                ttl=f"{self.ttl}s",
+                display_name=display_name,
+            ),
+        )
+        return cached.name, self._expiry(cached)
+
+    async def _refresh(self, name: str) -> float:
+        from google.genai import types
+
+        cached = await self.client().aio.caches.update(
+            name=name, config=types.UpdateCachedContentConfig(ttl=f"{self.ttl}s")
+        )
+        return self._expiry(cached)
+
+    async def _delete(self, name: str) -> None:
+        await self.client().aio.caches.delete(name=name)
+
+
+class FakeContextCache(ContextCache):
+    """In-process stand-in for tests and benchmarks; makes no network calls"""
+
+    def __init__(self, ttl: int, refresh_margin: int, min_tokens: int):
+        super().__init__(ttl, refresh_margin, min_tokens)
+        self.counter = itertools.count(1)
+        # name -> (prefix, expires_at), as the server would hold them
+        self.server: Dict[str, Tuple[str, float]] = {}
+
+    async def _create(self, model: str, prefix: str, display_name: str) -> Tuple[str, float]:
+        name = f"cachedContents/fake-{next(self.counter)}"
+        self.server[name] = (prefix, time.time() + self.ttl)
+        return name, self.server[name][1]
+
+    async def _refresh(self, name: str) -> float:
+        prefix, expires_at = self.server[name]
+        if expires_at < time.time():
+            del self.server[name]
+            raise KeyError(name)
+        self.server[name] = (prefix, time.time() + self.ttl)
+        return self.server[name][1]
+
+    async def _delete(self, name: str) -> None:
+        self.server.pop(name, None)
+
+
+def get_context_cache(name: Optional[str], client: Callable[[], Any]) -> Optional[ContextCache]:
+    """Create the cache configured by ``settings.context_cache`` (None = off)"""
+    if not name:
+        return None
+    args = (
+        settings.context_cache_ttl,
+        settings.context_cache_refresh_margin,
+        settings.context_cache_min_tokens,
+    )
+    if name == "gemini":
+        return GeminiContextCache(client, *args)
+    if name == "fake":
+        return FakeContextCache(*args)
+    raise ValueError(f"Unknown context cache: {name}")
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import random
+import re
+import struct
+import uuid
+import zlib
+from types import SimpleNamespace
+from typing import Any, Dict, Optional, Tuple
+
+from backend.config import settings
+from backend.services.upstream import estimate_tokens
+
+# "Respond with a JSON array of exactly $size objects" in batch_instructions.txt
+BATCH_SIZE_PATTERN = re.compile(r"array of exactly (\d+) objects")
+
+# Characters per streamed chunk, a few tokens' worth
+STREAM_CHUNK_CHARS = 16
+# Share of the latency spent before the first streamed chunk
+FIRST_CHUNK_SHARE = 0.2
+
+
+class FakeUpstreamError(Exception):
+    """Stands in for a google-genai APIError; ``code`` drives the retry policy"""
+
+    def __init__(self, code: int):
+        super().__init__(f"{code} fake upstream error")
+        self.code = code
+
+
+class FakeModels:
+    """
+    Offline stand-in for ``client.aio.models`` of the google-genai SDK
+
+    Latency is log-normally distributed around a median (``sigma`` 0 gives a
+    fixed latency), a share of calls fails with a retryable status, and
+    images are noise PNGs of a configurable size, made unique per call so
+    content-addressed storage still writes each one.
+
+    Text answers follow the requested ``response_schema``: one post, a list
+    of posts for batch requests, or only the fields of a partial schema.
+    Streamed answers arrive in small chunks spread over the latency.
+    """
+
+    def __init__(
+        self,
+        text_latency: float,
+        image_latency: float,
+        sigma: float,
+        error_rate: float,
+        error_status: int,
+        image_size: int,
+        seed: Optional[int] = None,
+    ):
+        self.text_latency = text_latency
+        self.image_latency = image_latency
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.image_size = image_size
+        self.random = random.Random(seed)
+        self.counter = 0
+        self._image: Optional[bytes] = None
+
+    def _latency(self, median: float) -> float:
+        return median * self.random.lognormvariate(0, self.sigma) if median else 0
+
+    def _maybe_fail(self) -> None:
+        if self.error_rate and self.random.random() < self.error_rate:
+            raise FakeUpstreamError(self.error_status)
+
+    async def _respond(self, median: float) -> None:
+        await asyncio.sleep(self._latency(median))
+        self._maybe_fail()
+
+    def _post(self) -> Dict[str, Any]:
+        self.counter += 1
+        return {
+            "caption": f"golden hour hits different 🌅 #{self.counter}",
+            "hashtags": ["goldenhour", "mood", "weekend", "vibes", "sunset"],
+            "image_prompt": (
+                "woman in a linen dress on a Malibu beach at golden hour, "
+                f"shot on Canon EOS R5, 85mm f/1.8, scene {self.counter}"
+            ),
+        }
+
+    @staticmethod
+    def _prompt_text(contents: Any) -> str:
+        return getattr(contents, "text", None) or str(contents)
+
+    def _answer(self, prompt: str, schema: Any) -> Any:
+        if getattr(schema, "__origin__", None) is list:
+            match = BATCH_SIZE_PATTERN.search(prompt)
+            return [self._post() for _ in range(int(match.group(1)) if match else 1)]
+        post = self._post()
+        fields = getattr(schema, "model_fields", None)
+        if fields is not None:
+            return {name: post[name] for name in fields if name in post}
+        return post
+
+    def _text_response(self, contents: Any, config: Any) -> Tuple[str, SimpleNamespace]:
+        prompt = self._prompt_text(contents)
+        text = json.dumps(self._answer(prompt, getattr(config, "response_schema", None)))
+        usage = SimpleNamespace(
+            prompt_token_count=estimate_tokens(prompt),
+            candidates_token_count=estimate_tokens(text),
+            cached_content_token_count=None,
+        )
+        return text, usage
+
+    async def generate_content(self, model: str, contents: Any, config: Any = None):
+        await self._respond(self.text_latency)
+        text, usage = self._text_response(contents, config)
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    async def generate_content_stream(self, model: str, contents: Any, config: Any = None):
+        # Like the SDK, nothing is requested (or fails) until the stream is read
+        text, usage = self._text_response(contents, config)
+        pieces = [
+            text[i : i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)
+        ]
+
+        async def chunks():
+            latency = self._latency(self.text_latency)
+            await asyncio.sleep(latency * FIRST_CHUNK_SHARE)
+            self._maybe_fail()
+            for i, piece in enumerate(pieces):
+                if i:
+                    await asyncio.sleep(latency * (1 - FIRST_CHUNK_SHARE) / len(pieces))
+                last = i == len(pieces) - 1
+                yield SimpleNamespace(text=piece, usage_metadata=usage if last else None)
+
+        return chunks()
+
+    def _unique_image(self) -> bytes:
+        if self._image is None:
+            from io import BytesIO
+
+            from PIL import Image
+
+            # Noise compresses about as badly as a photo, so sizes are realistic
+            buffered = BytesIO()
+            image = Image.effect_noise((self.image_size, self.image_size), 64).convert("RGB")
+            image.save(buffered, format="PNG")
+            self._image = buffered.getvalue()
+
+        # Insert a tEXt chunk before IEND: valid PNG, distinct bytes
+        data = b"nonce\x00" + uuid.uuid4().hex.encode()
+        chunk = struct.pack(">I", len(data)) + b"tEXt" + data
+        chunk += struct.pack(">I", zlib.crc32(chunk[4:]))
+        return self._image[:-12] + chunk + self._image[-12:]
+
+    async def generate_images(self, model: str, prompt: str, config: Any = None):
+        await self._respond(self.image_latency)
+        count = getattr(config, "number_of_images", None) or 1
+        images = [
+            SimpleNamespace(image=SimpleNamespace(image_bytes=self._unique_image()))
+            for _ in range(count)
+        ]
+        return SimpleNamespace(generated_images=images)
+
+
+def fake_client() -> SimpleNamespace:
+    """A client whose ``aio.models`` is a FakeModels configured from settings"""
+    models = FakeModels(
+        text_latency=settings.fake_text_latency,
+        image_latency=settings.fake_image_latency,
+        sigma=settings.fake_latency_sigma,
+        error_rate=settings.fake_error_rate,
+        error_status=settings.fake_error_status,
+        image_size=settings.fake_image_size,
+        seed=settings.fake_seed,
+    )
+    return SimpleNamespace(aio=SimpleNamespace(models=models))
@@ -1,166 +1,513 @@
-import json
-from typing import Any, Dict, Optional
-
-import google.genai as genai
-from google.genai import types
+import asyncio
+import copy
+import re
+from functools import lru_cache
+from typing import (
+    Annotated,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+
+from pydantic import BaseModel, TypeAdapter, ValidationError, create_model
 
 from backend.config import settings
-from backend.models import TemplateType
-from backend.services.imagen_service import imagen_service
+from backend.models import GeneratedContent, ImageVariant, TemplateType
+from backend.services.context_cache import get_context_cache
+from backend.services.fake_models import fake_client
+from backend.services.imagen_service import get_imagen_service
+from backend.services.json_parser import IncrementalJSONParser, parse_complete
+from backend.services.metrics import (
+    CAPTION_FIELD_REPAIRS,
+    CAPTION_PARSE_RESULTS,
+    GENERATIONS_IN_FLIGHT,
+)
+from backend.services.prompt_registry import get_prompt_registry
+from backend.services.response_cache import cache_key, caption_cache
+from backend.services.singleflight import SingleFlight
+from backend.services.tracing import logger, record_usage, tracer
+from backend.services.upstream import (
+    UpstreamClient,
+    UpstreamUnavailableError,
+    error_status,
+    estimate_tokens,
+)
+
+
+# Rough answer size per post, counted against the tokens/min quota
+OUTPUT_TOKENS_PER_POST = 400
+
+HASHTAG_PATTERN = re.compile(r"#(\w+)")
+
+# Called with (field name, value) as soon as a caption field is final
+FieldCallback = Callable[[str, Any], Awaitable[None]]
+
+# One validator per GeneratedContent field, so fields are accepted separately
+FIELD_ADAPTERS = {
+    name: TypeAdapter(
+        Annotated[(field.annotation, *field.metadata)] if field.metadata else field.annotation
+    )
+    for name, field in GeneratedContent.model_fields.items()
+}
+
+
+def validate_content(data: Any) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Split parsed model output into valid fields and the names of invalid ones
+
+    Hashtags are normalized (no leading "#", no blanks) before validation.
+    """
+    if not isinstance(data, dict):
+        return {}, list(FIELD_ADAPTERS)
+    if isinstance(data.get("hashtags"), list):
+        data["hashtags"] = [
+            tag.strip().lstrip("#") for tag in data["hashtags"]
+            if isinstance(tag, str) and tag.strip().lstrip("#")
+        ] or None
+
+    content: Dict[str, Any] = {}
+    invalid: List[str] = []
+    for name, adapter in FIELD_ADAPTERS.items():
+        try:
+            content[name] = adapter.validate_python(data[name])
+        except (KeyError, ValidationError):
+            invalid.append(name)
+    return content, invalid
+
+
+@lru_cache()
+def partial_schema(fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """Response schema asking for only some GeneratedContent fields"""
+    return create_model(
+        "GeneratedContentRepair",
+        **{name: (GeneratedContent.model_fields[name].annotation, ...) for name in fields},
+    )
 
 
 class GeminiService:
-    def __init__(self):
-        self.client = genai.Client(api_key=settings.gemini_api_key)
+    def __init__(self, max_concurrency: Optional[int] = None):
+        # Created on first use so importing the app doesn't load google.genai
+        self._client = None
         # Use model verified from client.models.list()
         self.text_model_id = "models/gemini-2.5-flash"
+        # Caps in-flight calls and paces them to the quota, with retries
+        self.upstream = UpstreamClient(
+            "gemini",
+            max_concurrency or settings.gemini_max_concurrency,
+            settings.gemini_requests_per_minute,
+            settings.gemini_tokens_per_minute,
+        )
+        self.inflight = SingleFlight()
+        # Server-side cache of each template's static prompt prefix (optional)
+        self.context_cache = get_context_cache(settings.context_cache, lambda: self.client)
+
+    @property
+    def client(self):
+        if self._client is None:
+            if settings.model_backend == "fake":
+                self._client = fake_client()
+            else:
+                import google.genai as genai
+
+                self._client = genai.Client(api_key=settings.gemini_api_key)
+        return self._client
+
+    @client.setter
+    def client(self, value) -> None:
+        self._client = value
 
     def get_template_config(self, template_type: TemplateType) -> Dict:
         """Get configuration for each template type"""
-        configs = {
-            TemplateType.VIRTUAL_INFLUENCER: {
-                "style": "professional, modern, fashion-forward",
-                "tone": "confident, inspiring, aspirational",
-                "visual_keywords": "hyper-realistic lifestyle content - can be people (men or women of various ages and ethnicities), fashion items, accessories, travel destinations, cityscapes, food, interior design, or aesthetic scenes. For people: professional portrait with natural skin texture, realistic features, natural poses. For objects/scenes: detailed product photography or lifestyle scenes. Always photorealistic, shot on location in real-world settings (urban streets, cafes, beaches, parks, rooftops, natural outdoor settings), natural lighting or golden hour, shot with professional DSLR camera, 85mm lens, f/1.8 aperture, shallow depth of field, real photograph quality from Instagram or professional portfolio",
-                "content_focus": "lifestyle inspiration, fashion, style trends, travel, aesthetics, beauty, design, confidence - diverse content that resonates with modern social media",
-            },
-            TemplateType.BOOK_BLOG: {
-                "style": "cozy, intellectual, warm",
-                "tone": "thoughtful, engaging, literary",
-                "visual_keywords": "aesthetic book flat lay, coffee, cozy reading nook, vintage books, natural lighting, minimal",
-                "content_focus": "book recommendations, reading insights, literary quotes, author spotlights",
-            },
-            TemplateType.AESTHETIC: {
-                "style": "dreamy, minimal, artistic",
-                "tone": "poetic, inspiring, calm",
-                "visual_keywords": "aesthetic minimal scene, soft pastels, dreamy atmosphere, artistic composition, modern minimalism",
-                "content_focus": "inspiring quotes, aesthetic moments, mindful living, beauty in simplicity",
-            },
-            TemplateType.LUXURY_LIFE: {
-                "style": "elegant, aspirational, premium",
-                "tone": "sophisticated, exclusive, refined",
-                "visual_keywords": "luxury lifestyle, high-end fashion, exotic travel destinations, premium cars, elegant interiors, golden hour",
-                "content_focus": "luxury experiences, premium lifestyle tips, exclusive destinations, sophisticated living",
-            },
-            TemplateType.CUSTOM: {
-                "style": "flexible, creative, user-defined",
-                "tone": "adaptable based on user request",
-                "visual_keywords": "photorealistic, high-quality photography, natural lighting, real-world setting",
-                "content_focus": "completely based on user's custom prompt - follow their instructions closely",
-            },
-        }
-        return configs.get(template_type, configs[TemplateType.VIRTUAL_INFLUENCER])
+        return get_prompt_registry().template_config(template_type)
+
+    def build_caption_prompt(
+        self,
+        template_type: TemplateType,
+        custom_prompt: Optional[str] = None,
+        tone: str = "professional",
+        variation: Optional[str] = None,
+    ) -> str:
+        """Build the full caption prompt: the template's static prefix plus the request"""
+        prompts = get_prompt_registry()
+        return prompts.caption_prefix(template_type) + prompts.caption_request(
+            template_type, custom_prompt, tone, variation
+        )
 
     async def generate_caption(
         self,
         template_type: TemplateType,
         custom_prompt: Optional[str] = None,
         tone: str = "professional",
+        bypass_cache: bool = False,
+        variation: Optional[str] = None,
+        on_field: Optional[FieldCallback] = None,
     ) -> Dict[str, Any]:
-        """Generate caption and hashtags for a post"""
-        config = self.get_template_config(template_type)
+        """
+        Generate caption and hashtags for a post
+
+        Args:
+            template_type: Template to generate for
+            custom_prompt: Optional user instructions
+            tone: Desired tone
+            bypass_cache: Skip the caption cache lookup and don't share an
+                identical in-flight request (the result is still cached)
+            variation: Optional variation label; different labels produce and
+                cache different results for the same request
+            on_field: Optional callback invoked with each field (caption,
+                hashtags, image_prompt) as soon as it is final; the answer
+                is then streamed from the model
+        """
+        request = get_prompt_registry().caption_request(
+            template_type, custom_prompt, tone, variation
+        )
+        prompt = get_prompt_registry().caption_prefix(template_type) + request
+
+        key = cache_key(self.text_model_id, prompt)
+        if not bypass_cache:
+            cached = await caption_cache.get(key)
+            if cached is not None:
+                if on_field:
+                    for field in FIELD_ADAPTERS:
+                        await on_field(field, cached[field])
+                return cached
+
+        if on_field:
+            # A stream can't be shared, so streamed requests aren't coalesced
+            return await self._request_caption(request, key, template_type, on_field)
+        if bypass_cache:
+            # Asked for a fresh answer (e.g. campaign variations), so don't
+            # share another request's
+            return await self._request_caption(request, key, template_type)
+
+        # Identical concurrent requests share one upstream call
+        result = await self.inflight.do(
+            key, lambda: self._request_caption(request, key, template_type)
+        )
+        return copy.deepcopy(result)
 
-        # For CUSTOM template, emphasize user's custom prompt
-        if template_type == TemplateType.CUSTOM and custom_prompt:
-            intro = f"""
-You are a social media content creator. The user wants you to create content based on their specific request:
+    def _call_model(self, stream: bool, **kwargs) -> Awaitable:
+        """One attempt at a text model call, streamed or not"""
+        if stream:
+            return self._open_stream(**kwargs)
+        return self.client.aio.models.generate_content(**kwargs)
 
-USER REQUEST: {custom_prompt}
+    async def _open_stream(self, **kwargs) -> AsyncIterator:
+        """
+        Start a streamed answer and wait for its first chunk
 
-Follow the user's request closely and create appropriate content that matches their vision.
-"""
-        else:
-            intro = f"""
-You are a social media content creator specializing in {template_type.value.replace('_', ' ')} content.
-
-Style: {config['style']}
-Tone: {tone}, {config['tone']}
-Content Focus: {config['content_focus']}
-
-{f"Additional guidance: {custom_prompt}" if custom_prompt else ""}
-"""
-
-        prompt = intro + """
-Create an engaging social media post that sounds NATURAL and HUMAN, not AI-generated:
-
-1. A CASUAL, SHORT caption (1-2 short sentences max, or even just a few words with emojis):
-   - Use emojis naturally (2-4 emojis max)
-   - Keep it SHORT and conversational like real people post
-   - NO corporate speak, NO "call to action", NO overly polished language
-   - Examples of good captions:
-     * "mood ✨💫"
-     * "living for these vibes 🌊"
-     * "current situation 😌☕️"
-     * "obsessed 🖤"
-     * "golden hour hits different 🌅"
-   - Sound like a real person, not a brand
-
-2. 5-8 relevant hashtags (mix of popular and niche)
-
-3. A HIGHLY DETAILED image generation prompt that describes a PHOTOREALISTIC scene that looks like a real photograph:
-
-   CHOOSE ONE OF THESE CONTENT TYPES (vary the content to keep it interesting):
-
-   A) PERSON/PEOPLE (any gender, age 20-40, diverse ethnicities):
-      - Specific person details (age, gender, ethnicity, hair, eyes, skin tone, outfit)
-      - Natural pose and authentic expression
-      - Real-world location and setting
-
-   B) LIFESTYLE SCENE (no people, just objects/places):
-      - Travel destinations (cityscapes, landmarks, beaches, mountains)
-      - Food/drinks (coffee, meals, aesthetic food photography)
-      - Fashion items (shoes, bags, accessories, clothing flat lays)
-      - Interior design (modern apartments, cozy spaces, aesthetic rooms)
-      - Nature scenes (sunsets, flowers, landscapes)
-
-   ALWAYS INCLUDE:
-   - REAL-WORLD SPECIFIC LOCATION:
-     * Urban: "busy NYC street corner near Times Square", "Brooklyn Bridge at sunset", "Paris cafe terrace in Montmartre"
-     * Nature: "California Malibu beach at golden hour", "Central Park in autumn", "Japanese cherry blossom garden"
-     * Indoor: "modern loft apartment in SoHo", "vintage bookstore in London", "minimalist Scandinavian coffee shop"
-   - Natural lighting: "golden hour sunlight", "soft overcast daylight", "warm afternoon sun"
-   - Camera: shot with Canon EOS R5 or Nikon D850, 85mm lens, f/1.8
-   - Environmental details for realism (blurred background, natural elements, authentic atmosphere)
-   - Overall mood: authentic, candid, like a real Instagram photo from a lifestyle influencer
-
-Format your response as JSON:
-{{
-    "caption": "your caption here",
-    "hashtags": ["hashtag1", "hashtag2", ...],
-    "image_prompt": "ULTRA DETAILED photorealistic image prompt with specific visual details"
-}}
-"""
-
-        response = self.client.models.generate_content(
+        The request is only sent when the stream is first read, so reading
+        the first chunk here lets the retry policy cover connection errors.
+        """
+        chunks = await self.client.aio.models.generate_content_stream(**kwargs)
+        first = await anext(chunks, None)
+
+        async def stream():
+            if first is not None:
+                yield first
+            async for chunk in chunks:
+                yield chunk
+
+        return stream()
+
+    async def _generate(
+        self,
+        template_type: TemplateType,
+        request: str,
+        output_tokens: int,
+        stream: bool = False,
+        **config,
+    ):
+        """
+        Call the text model with the template's prefix followed by ``request``
+
+        With a context cache configured, the prefix is referenced as cached
+        content instead of being sent again; if the cache is unavailable or
+        the entry is rejected, the full prompt is sent instead. With
+        ``stream`` an async iterator of response chunks is returned; only
+        opening it counts against the concurrency limit and is retried.
+        """
+        from google.genai import types
+
+        prefix = get_prompt_registry().caption_prefix(template_type)
+        tokens = estimate_tokens(prefix + request) + output_tokens
+
+        cached_content = None
+        if self.context_cache:
+            cached_content = await self.context_cache.get(
+                self.text_model_id, template_type.value, prefix
+            )
+        if cached_content:
+            try:
+                return await self.upstream.call(
+                    lambda: self._call_model(
+                        stream,
+                        model=self.text_model_id,
+                        contents=types.Part.from_text(text=request),
+                        config=types.GenerateContentConfig(
+                            cached_content=cached_content, **config
+                        ),
+                    ),
+                    tokens=tokens,
+                    model=self.text_model_id,
+                )
+            except UpstreamUnavailableError:
+                raise
+            except Exception as e:
+                # Entry expired or deleted upstream: drop it and send the full prompt
+                if error_status(e) not in (400, 403, 404):
+                    raise
+                await self.context_cache.invalidate(self.text_model_id, template_type.value)
+
+        # Async client keeps the event loop free while the model is working
+        return await self.upstream.call(
+            lambda: self._call_model(
+                stream,
+                model=self.text_model_id,
+                contents=types.Part.from_text(text=prefix + request),
+                config=types.GenerateContentConfig(**config) if config else None,
+            ),
+            tokens=tokens,
             model=self.text_model_id,
-            contents=types.Part.from_text(text=prompt),
         )
 
-        text = (response.text or "").strip()
+    async def _stream_caption(
+        self,
+        template_type: TemplateType,
+        request: str,
+        span,
+        on_field: FieldCallback,
+        emitted: List[str],
+    ) -> str:
+        """
+        Stream the structured answer, reporting each field once it is final
 
-        try:
-            # Extract JSON from response
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.endswith("```"):
-                text = text[:-3]
-            text = text.strip()
+        Fields are reported in the order the model writes them, and only if
+        valid; invalid ones are left to the repair step.
 
-            result = json.loads(text)
+        Returns:
+            The full response text
+        """
+        config = self.get_template_config(template_type)
+        parser = IncrementalJSONParser()
+        text: List[str] = []
+        checked = 0
+
+        chunks = await self._generate(
+            template_type,
+            request,
+            OUTPUT_TOKENS_PER_POST,
+            stream=True,
+            response_mime_type="application/json",
+            response_schema=GeneratedContent,
+        )
+        async for chunk in chunks:
+            # Usage arrives with the last chunk
+            record_usage(span, chunk)
+            text.append(chunk.text or "")
+            parser.feed(chunk.text or "")
+            if len(parser.completed) == checked:
+                continue
+
+            content, _ = validate_content(parser.value())
+            for field in parser.completed[checked:]:
+                if field not in content or field in emitted:
+                    continue
+                value = content[field]
+                if field == "image_prompt":
+                    value = f"{config['visual_keywords']}, {value}"
+                emitted.append(field)
+                span.add_event("caption.field", {"field": field})
+                await on_field(field, value)
+            checked = len(parser.completed)
+        return "".join(text)
+
+    async def _request_caption(
+        self,
+        request: str,
+        key: str,
+        template_type: TemplateType,
+        on_field: Optional[FieldCallback] = None,
+    ) -> Dict[str, Any]:
+        """
+        Call the model for a built request and validate its structured answer
 
-            # Enhance image prompt with template-specific keywords
-            result["image_prompt"] = (
-                f"{config['visual_keywords']}, {result.get('image_prompt', '')}"
+        Fields that are missing or invalid are repaired locally where
+        possible (hashtags written into the caption), otherwise requested
+        again on their own, up to ``caption_repair_attempts`` times. Only
+        fully valid results are cached. With ``on_field`` the answer is
+        streamed and each field reported as soon as it is final.
+
+        Raises:
+            ValueError: No usable caption even after repair
+        """
+        config = self.get_template_config(template_type)
+        emitted: List[str] = []
+
+        with tracer.start_as_current_span(
+            "generate_caption",
+            attributes={
+                "template.type": template_type.value,
+                "gen_ai.request.model": self.text_model_id,
+                "gen_ai.request.estimated_tokens": estimate_tokens(request),
+                "gen_ai.request.stream": on_field is not None,
+            },
+        ) as span, GENERATIONS_IN_FLIGHT.labels("caption").track_inprogress():
+            if on_field:
+                text = await self._stream_caption(
+                    template_type, request, span, on_field, emitted
+                )
+            else:
+                response = await self._generate(
+                    template_type,
+                    request,
+                    OUTPUT_TOKENS_PER_POST,
+                    response_mime_type="application/json",
+                    response_schema=GeneratedContent,
+                )
+                record_usage(span, response)
+                text = response.text or ""
+
+        with tracer.start_as_current_span("parse_json") as span:
+            content, invalid = validate_content(parse_complete(text))
+            span.set_attribute("parse.invalid_fields", invalid)
+
+        outcome = "valid"
+        if "hashtags" in invalid and content.get("caption"):
+            hashtags = HASHTAG_PATTERN.findall(content["caption"])
+            if hashtags:
+                content["hashtags"] = hashtags
+                invalid.remove("hashtags")
+                outcome = "repaired"
+
+        prompts = get_prompt_registry()
+        for _ in range(settings.caption_repair_attempts if invalid else 0):
+            for field in invalid:
+                CAPTION_FIELD_REPAIRS.labels(field).inc()
+            with tracer.start_as_current_span(
+                "repair_caption", attributes={"parse.invalid_fields": invalid}
+            ) as span:
+                response = await self._generate(
+                    template_type,
+                    request + prompts.repair_instructions(content, invalid),
+                    OUTPUT_TOKENS_PER_POST,
+                    response_mime_type="application/json",
+                    response_schema=partial_schema(tuple(invalid)),
+                )
+                record_usage(span, response)
+            repaired, _ = validate_content(parse_complete(response.text or ""))
+            for field in list(invalid):
+                if field in repaired:
+                    content[field] = repaired[field]
+                    invalid.remove(field)
+            outcome = "retried"
+            if not invalid:
+                break
+
+        if invalid:
+            logger.warning(
+                "Caption response still invalid after repair",
+                extra={"template_type": template_type.value, "fields": invalid},
             )
+            if "caption" in invalid:
+                CAPTION_PARSE_RESULTS.labels("single", "failed").inc()
+                raise ValueError("Model returned no usable caption")
+            outcome = "fallback"
+            content.setdefault("hashtags", ["content", "socialmedia", template_type.value])
+            content.setdefault("image_prompt", "")
+        CAPTION_PARSE_RESULTS.labels("single", outcome).inc()
+
+        # Enhance image prompt with template-specific keywords
+        result = dict(content)
+        result["image_prompt"] = f"{config['visual_keywords']}, {content['image_prompt']}"
+
+        # Only well-formed results are cached; fallbacks are retried next time
+        if not invalid:
+            await caption_cache.set(key, result)
+
+        if on_field:
+            # Repaired, recovered or defaulted fields come after the stream
+            for field in FIELD_ADAPTERS:
+                if field not in emitted:
+                    await on_field(field, result[field])
+        return result
+
+    async def generate_caption_batch(
+        self,
+        template_type: TemplateType,
+        start: int,
+        size: int,
+        total: int,
+        tone: str = "professional",
+        custom_prompt: Optional[str] = None,
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Generate several distinct posts with one structured-output call
 
-            return result
-        except json.JSONDecodeError:
-            # Fallback if JSON parsing fails
-            return {
-                "caption": text[:200],
-                "hashtags": ["content", "socialmedia", template_type.value],
-                "image_prompt": config["visual_keywords"],
-            }
+        Args:
+            start: Index of the first post in the campaign (or group)
+            size: Number of posts to request
+            total: Number of posts in the whole campaign (or group)
+            custom_prompt: Optional user instructions shared by every post
+
+        Returns:
+            One content dict per requested post, or None for items that were
+            missing or failed validation
+        """
+        config = self.get_template_config(template_type)
+        prompts = get_prompt_registry()
+        request = prompts.caption_request(template_type, custom_prompt, tone)
+        request += prompts.batch_instructions(size, start + 1, start + size, total)
+
+        with tracer.start_as_current_span(
+            "generate_caption_batch",
+            attributes={
+                "template.type": template_type.value,
+                "post.index": start,
+                "post.count": size,
+                "gen_ai.request.model": self.text_model_id,
+            },
+        ) as span, GENERATIONS_IN_FLIGHT.labels("caption_batch").track_inprogress():
+            response = await self._generate(
+                template_type,
+                request,
+                OUTPUT_TOKENS_PER_POST * size,
+                response_mime_type="application/json",
+                response_schema=list[GeneratedContent],
+            )
+            record_usage(span, response)
+
+        with tracer.start_as_current_span("parse_json"):
+            # A truncated array still yields the items that were fully written
+            items = parse_complete(response.text or "")
+        if not isinstance(items, list):
+            logger.warning(
+                "Caption batch response was not a JSON list",
+                extra={"template_type": template_type.value, "post_index": start},
+            )
+            items = []
+
+        results: List[Optional[Dict[str, Any]]] = []
+        for item in items[:size]:
+            content, invalid = validate_content(item)
+            if invalid:
+                results.append(None)
+                continue
+
+            # Enhance image prompt with template-specific keywords
+            content["image_prompt"] = f"{config['visual_keywords']}, {content['image_prompt']}"
+            results.append(content)
+
+        valid = sum(result is not None for result in results)
+        CAPTION_PARSE_RESULTS.labels("batch", "valid").inc(valid)
+        CAPTION_PARSE_RESULTS.labels("batch", "failed").inc(size - valid)
+        return results + [None] * (size - len(results))
 
     async def generate_image_url(self, prompt: str) -> str:
         """
@@ -170,24 +517,91 @@ Format your response as JSON:
             prompt: The image generation prompt
 
         Returns:
-            Base64 encoded image data URL or placeholder URL
+            URL of the stored image (placeholder when Vertex AI is not configured)
         """
-        return await imagen_service.generate_image(prompt)
+        return await get_imagen_service().generate_image(prompt)
+
+    async def generate_image_variants(self, prompt: str, count: int) -> List[ImageVariant]:
+        """
+        Generate several alternative images with one Imagen call
+
+        Returns:
+            The stored variants, the preselected one first
+        """
+        return await get_imagen_service().generate_image_variants(prompt, count)
 
     async def generate_campaign_posts(
-        self, template_type: TemplateType, count: int, tone: str = "professional"
-    ) -> list:
-        """Generate multiple posts for a campaign"""
-        posts = []
+        self,
+        template_type: TemplateType,
+        count: int,
+        tone: str = "professional",
+        concurrency: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[int, Union[Dict[str, Any], Exception]]]:
+        """
+        Generate captions for a campaign concurrently
 
-        for i in range(count):
+        With ``campaign_batch_size`` > 1, captions are requested in chunks
+        with one structured-output call each; only items that fail
+        validation fall back to single calls.
+
+        Yields:
+            (index, content) pairs in completion order. A failed caption is
+            yielded as its exception so callers can handle it per post.
+        """
+        semaphore = asyncio.Semaphore(
+            concurrency or settings.campaign_caption_concurrency
+        )
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def generate_one(i: int):
             variation_prompt = (
                 f"Create variation {i+1} of {count}. Make it unique and engaging."
             )
-            content = await self.generate_caption(template_type, variation_prompt, tone)
-            posts.append(content)
-
-        return posts
-
+            with tracer.start_as_current_span("campaign_caption", attributes={"post.index": i}):
+                async with semaphore:
+                    try:
+                        # Campaign posts are meant to differ, so never serve them from cache
+                        content = await self.generate_caption(
+                            template_type, variation_prompt, tone, bypass_cache=True
+                        )
+                    except Exception as e:
+                        content = e
+            await results.put((i, content))
+
+        async def generate_chunk(start: int, size: int):
+            async with semaphore:
+                try:
+                    contents = await self.generate_caption_batch(
+                        template_type, start, size, count, tone
+                    )
+                except Exception as e:
+                    contents = [e] * size
+
+            retries = []
+            for offset, content in enumerate(contents):
+                if content is None:
+                    retries.append(generate_one(start + offset))
+                else:
+                    await results.put((start + offset, content))
+            await asyncio.gather(*retries)
+
+        batch_size = settings.campaign_batch_size
+        if batch_size > 1:
+            tasks = [
+                asyncio.create_task(generate_chunk(start, min(batch_size, count - start)))
+                for start in range(0, count, batch_size)
+            ]
+        else:
+            tasks = [asyncio.create_task(generate_one(i)) for i in range(count)]
 
-gemini_service = GeminiService()
+        try:
+            for _ in range(count):
+                yield await results.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+@lru_cache()
+def get_gemini_service() -> GeminiService:
+    """Shared GeminiService, created on first use"""
+    return GeminiService()
@@ -0,0 +1,132 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Optional, Tuple
+
+from backend.config import settings
+from backend.services.metrics import IMAGE_PROCESS_SECONDS
+
+FORMATS = {
+    "png": ("PNG", "image/png"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+}
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def detect_content_type(data: bytes) -> Optional[str]:
+    """Identify an encoded image from its magic bytes, without decoding it"""
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def transcode(data: bytes, fmt: str, quality: int) -> bytes:
+    """Decode and re-encode an image (CPU bound, runs in the process pool)"""
+    from PIL import Image
+
+    pil_format, _ = FORMATS[fmt]
+    image = Image.open(BytesIO(data))
+    if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    buffered = BytesIO()
+    image.save(buffered, format=pil_format, quality=quality)
+    return buffered.getvalue()
+
+
+def thumbnail(data: bytes, width: int, fmt: str, quality: int) -> bytes:
+    """Downscale an image to the given width (CPU bound, runs in the process pool)"""
+    from PIL import Image
+
+    pil_format, _ = FORMATS[fmt]
+    image = Image.open(BytesIO(data))
+    image.thumbnail((width, width * image.height // image.width))
+    if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    buffered = BytesIO()
+    image.save(buffered, format=pil_format, quality=quality)
+    return buffered.getvalue()
+
+
+def score(data: bytes, method: str) -> float:
+    """
+    Cheap quality score for picking between variants (higher is better)
+
+    "sharpness" is the variance of an edge-filtered grayscale copy, so blurry
+    images score low; "entropy" is the grayscale histogram entropy, so flat
+    or washed-out images score low. Both run on a 256px copy.
+    """
+    from PIL import Image, ImageFilter, ImageStat
+
+    image = Image.open(BytesIO(data)).convert("L")
+    image.thumbnail((256, 256))
+    if method == "entropy":
+        return image.entropy()
+    if method == "sharpness":
+        return ImageStat.Stat(image.filter(ImageFilter.FIND_EDGES)).var[0]
+    raise ValueError(f"Unknown image scorer: {method}")
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=settings.image_process_workers)
+    return _process_pool
+
+
+def shutdown() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+async def _run_in_process(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), func, *args)
+
+
+async def prepare_image(data: bytes) -> Tuple[bytes, str]:
+    """
+    Get provider image bytes ready for storage
+
+    Bytes already in an accepted format are passed through untouched.
+    Anything else, or every image when IMAGE_TRANSCODE_FORMAT is set, is
+    re-encoded off the event loop.
+
+    Returns:
+        (image bytes, content type)
+    """
+    with IMAGE_PROCESS_SECONDS.labels("prepare").time():
+        content_type = detect_content_type(data)
+        target = settings.image_transcode_format
+
+        if target is None and content_type in settings.image_passthrough_types:
+            return data, content_type
+
+        fmt = target or "png"
+        encoded = await _run_in_process(transcode, data, fmt, settings.image_quality)
+        return encoded, FORMATS[fmt][1]
+
+
+async def make_thumbnail(data: bytes, width: int) -> Tuple[bytes, str]:
+    """Render a thumbnail variant in the process pool"""
+    fmt = settings.image_thumbnail_format
+    with IMAGE_PROCESS_SECONDS.labels("thumbnail").time():
+        encoded = await _run_in_process(
+            thumbnail, data, width, fmt, settings.image_quality
+        )
+    return encoded, FORMATS[fmt][1]
+
+
+async def score_image(data: bytes, method: str) -> float:
+    """Score an image in the process pool (see ``score``)"""
+    with IMAGE_PROCESS_SECONDS.labels("score").time():
+        return await _run_in_process(score, data, method)
@@ -1,16 +1,42 @@
-import base64
+import asyncio
 import os
-from io import BytesIO
-from typing import Optional
-
-from PIL import Image
+from functools import lru_cache
+from typing import List, Optional
 
 from backend.config import settings
+from backend.models import ImageVariant
+from backend.services import image_processing
+from backend.services.blob_store import blob_store, variant_key
+from backend.services.fake_models import fake_client
+from backend.services.metrics import GENERATIONS_IN_FLIGHT
+from backend.services.prompt_registry import get_prompt_registry
+from backend.services.response_cache import cache_key
+from backend.services.singleflight import SingleFlight
+from backend.services.tracing import logger, tracer
+from backend.services.upstream import UpstreamClient
 
 
 class ImagenService:
-    def __init__(self):
+    def __init__(self, max_concurrency: Optional[int] = None):
         """Initialize Imagen service using google-genai SDK"""
+        # Caps in-flight calls and paces them to the quota, with retries
+        self.upstream = UpstreamClient(
+            "imagen",
+            max_concurrency or settings.imagen_max_concurrency,
+            settings.imagen_requests_per_minute,
+        )
+        self.model_id = "imagen-3.0-generate-001"
+        self.inflight = SingleFlight()
+        # The Vertex client is created on first use, keeping google.genai and
+        # credential setup off the startup path
+        self._client = None
+        self._enabled: Optional[bool] = None
+
+    def _connect(self) -> None:
+        if settings.model_backend == "fake":
+            self._client = fake_client()
+            self._enabled = True
+            return
         try:
             import google.genai as genai
 
@@ -21,21 +47,41 @@ class ImagenService:
 
             # Initialize client
             if settings.google_cloud_project:
-                self.client = genai.Client(
+                self._client = genai.Client(
                     vertexai=True,
                     project=settings.google_cloud_project,
                     location=settings.gcp_region,
                 )
-                self.enabled = True
-                print("✅ Vertex AI Imagen initialized successfully")
+                self._enabled = True
+                logger.info("Vertex AI Imagen initialized")
             else:
-                self.enabled = False
-                print(
-                    "⚠️  Warning: Vertex AI not configured. Image generation will use placeholders."
+                self._enabled = False
+                logger.warning(
+                    "Vertex AI not configured. Image generation will use placeholders."
                 )
-        except Exception as e:
-            self.enabled = False
-            print(f"⚠️  Warning: Could not initialize Vertex AI: {str(e)}")
+        except Exception:
+            self._enabled = False
+            logger.warning("Could not initialize Vertex AI", exc_info=True)
+
+    @property
+    def enabled(self) -> bool:
+        if self._enabled is None:
+            self._connect()
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value: bool) -> None:
+        self._enabled = value
+
+    @property
+    def client(self):
+        if self._enabled is None:
+            self._connect()
+        return self._client
+
+    @client.setter
+    def client(self, value) -> None:
+        self._client = value
 
     async def generate_image(
         self, prompt: str, negative_prompt: Optional[str] = None
@@ -48,69 +94,147 @@ class ImagenService:
             negative_prompt: Things to avoid in the image
 
         Returns:
-            Base64 encoded image string or placeholder URL
+            URL of the stored image (placeholder when Vertex AI is not configured)
+
+        Raises:
+            UpstreamUnavailableError: Imagen is rate limited or down after retries
+            RuntimeError: Imagen returned no image
         """
-        if not self.enabled:
-            return "https://placehold.co/1024x1024/png?text=Configure+Vertex+AI"
+        variants = await self.generate_image_variants(prompt, 1, negative_prompt)
+        return variants[0].url
 
-        try:
-            import google.genai.types as types
-
-            # Enhanced prompt for ultra-realistic photography (people, objects, places, or scenes)
-            enhanced_prompt = f"{prompt}, hyper-realistic photograph, photorealistic, authentic real photography, natural lighting, real-world location, DSLR camera, 85mm lens or appropriate focal length, f/1.8 aperture, shallow depth of field with natural bokeh, realistic textures and details, authentic environmental details, professional photography quality, shot on Nikon D850 or Canon EOS R5, 8k resolution, ultra high definition, RAW unedited photo quality, looks like a real photograph from Instagram or professional photography portfolio, natural colors, lifelike"
-
-            # Comprehensive negative prompt for maximum realism
-            if not negative_prompt:
-                negative_prompt = "unrealistic, fake, artificial, CGI, 3D render, cartoon, anime, illustration, drawing, painting, sculpture, low quality, blurry, distorted, deformed, mutated, disfigured, ugly, bad anatomy, extra limbs, missing limbs, floating limbs, bad proportions, gross proportions, malformed, poorly drawn face, duplicate, bad hands, bad fingers, extra fingers, missing fingers, text, watermark, logo, signature, username"
-
-            print("🎨 Generating image with Imagen 3...")
-
-            # Generate image using new SDK
-            response = self.client.models.generate_images(
-                model="imagen-3.0-generate-001",
-                prompt=enhanced_prompt,
-                config=types.GenerateImagesConfig(
-                    negative_prompt=negative_prompt,
-                    number_of_images=1,
-                    aspect_ratio="1:1",
-                ),
-            )
+    async def generate_image_variants(
+        self, prompt: str, count: int, negative_prompt: Optional[str] = None
+    ) -> List[ImageVariant]:
+        """
+        Generate up to four alternative images with a single Imagen call
 
-            # Get the generated image
-            if (
-                response
-                and hasattr(response, "generated_images")
-                and response.generated_images
-            ):
-                generated_image = response.generated_images[0]
+        Every variant is stored full size plus a thumbnail at the smallest
+        configured width. With ``image_variant_scorer`` set, variants are
+        ordered best first by a local quality score; otherwise they keep
+        the order Imagen returned them in.
 
-                # Convert image to base64
-                if hasattr(generated_image, "image") and generated_image.image:
-                    # Get image data
-                    if (
-                        hasattr(generated_image.image, "image_bytes")
-                        and generated_image.image.image_bytes
-                    ):
-                        image_data = generated_image.image.image_bytes
+        Args:
+            prompt: The image generation prompt
+            count: Number of images to request (1-4); safety filtering may
+                return fewer
+            negative_prompt: Things to avoid in the image
 
-                        # Convert to PIL Image and then to base64
-                        pil_image = Image.open(BytesIO(image_data))
-                        buffered = BytesIO()
-                        pil_image.save(buffered, format="PNG")
-                        img_str = base64.b64encode(buffered.getvalue()).decode()
+        Returns:
+            The stored variants, the preselected one first
 
-                        print("✅ Image generated successfully")
-                        return f"data:image/png;base64,{img_str}"
+        Raises:
+            UpstreamUnavailableError: Imagen is rate limited or down after retries
+            RuntimeError: Imagen returned no image
+        """
+        if not self.enabled:
+            return [
+                ImageVariant(url="https://placehold.co/1024x1024/png?text=Configure+Vertex+AI")
+            ]
+
+        # Fixed photorealism suffix and negative prompt from the prompt registry
+        prompts = get_prompt_registry()
+        enhanced_prompt = prompts.image_prompt(prompt)
+        if not negative_prompt:
+            negative_prompt = prompts.negative_prompt
+
+        # Identical concurrent requests share one upstream call
+        key = cache_key(self.model_id, f"{enhanced_prompt}\n{negative_prompt}\n{count}")
+        variants = await self.inflight.do(
+            key, lambda: self._request_images(enhanced_prompt, negative_prompt, count)
+        )
+        return [variant.model_copy() for variant in variants]
+
+    async def _request_images(
+        self, enhanced_prompt: str, negative_prompt: str, count: int
+    ) -> List[ImageVariant]:
+        """Call Imagen for a fully built prompt and store the results"""
+        import google.genai.types as types
+
+        with tracer.start_as_current_span(
+            "generate_image",
+            attributes={"gen_ai.request.model": self.model_id, "image.count": count},
+        ) as span:
+            # Generate image using the async client so the event loop stays free
+            with GENERATIONS_IN_FLIGHT.labels("image").track_inprogress():
+                response = await self.upstream.call(
+                    lambda: self.client.aio.models.generate_images(
+                        model=self.model_id,
+                        prompt=enhanced_prompt,
+                        config=types.GenerateImagesConfig(
+                            negative_prompt=negative_prompt,
+                            number_of_images=count,
+                            aspect_ratio="1:1",
+                        ),
+                    ),
+                    model=self.model_id,
+                )
 
-            print("❌ Image generation failed - no images returned")
-            return "https://placehold.co/1024x1024/png?text=Generation+Failed"
+            # Get the generated images; filtered ones come back without bytes
+            images = []
+            for generated_image in getattr(response, "generated_images", None) or []:
+                image = getattr(generated_image, "image", None)
+                image_data = getattr(image, "image_bytes", None) if image else None
+                if image_data:
+                    images.append(image_data)
+            span.set_attribute("image.returned", len(images))
+
+            if not images:
+                # Usually a safety filter; failing keeps placeholders out of saved posts
+                span.set_attribute("image.filtered", True)
+                logger.error(
+                    "Image generation failed - no images returned",
+                    extra={"model": self.model_id},
+                )
+                raise RuntimeError("Image generation failed - no images returned")
 
-        except Exception as e:
-            print(f"❌ Image generation error: {str(e)}")
-            import traceback
+            variants = await asyncio.gather(
+                *(self._store_variant(image_data, count > 1) for image_data in images)
+            )
+            if settings.image_variant_scorer and len(variants) > 1:
+                variants = sorted(variants, key=lambda variant: -variant.score)
 
-            traceback.print_exc()
-            return "https://placehold.co/1024x1024/png?text=Error"
+            logger.info(
+                "Image generated",
+                extra={"model": self.model_id, "variants": len(variants)},
+            )
+            return list(variants)
+
+    async def _store_variant(self, image_data: bytes, with_thumbnail: bool) -> ImageVariant:
+        """Encode and store one image, plus its thumbnail and score for variants"""
+        # Pass provider bytes through unless a transcode is needed
+        with tracer.start_as_current_span("image_encode") as encode:
+            image_data, content_type = await image_processing.prepare_image(image_data)
+            encode.set_attribute("image.content_type", content_type)
+            encode.set_attribute("image.bytes", len(image_data))
+
+        # Store out-of-band; posts only keep a short URL
+        with tracer.start_as_current_span("storage_write"):
+            key = await blob_store.put(image_data, content_type)
+        variant = ImageVariant(url=blob_store.url_for(key))
+        if not with_thumbnail:
+            return variant
+
+        widths = settings.image_thumbnail_widths
+        if widths:
+            # Stored under the key the images endpoint serves for ?w=
+            width = min(widths)
+            thumbnail, thumbnail_type = await image_processing.make_thumbnail(image_data, width)
+            with tracer.start_as_current_span("storage_write"):
+                await blob_store.put(
+                    thumbnail,
+                    thumbnail_type,
+                    key=variant_key(key, f"w{width}", thumbnail_type),
+                )
+            variant.thumbnail_url = f"{variant.url}?w={width}"
+        if settings.image_variant_scorer:
+            variant.score = await image_processing.score_image(
+                image_data, settings.image_variant_scorer
+            )
+        return variant
 
 
-imagen_service = ImagenService()
+@lru_cache()
+def get_imagen_service() -> ImagenService:
+    """Shared ImagenService, created on first use"""
+    return ImagenService()
@@ -0,0 +1,353 @@
+import asyncio
+import json
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from backend.config import settings
+from backend.models import Job, JobStatus, Post, PostStatus
+from backend.services.tracing import logger, tracer
+
+# A handler runs one job and returns the id of the object it produced
+JobHandler = Callable[[Job, Dict[str, Any]], Awaitable[Optional[str]]]
+
+
+class JobBackend(ABC):
+    """
+    Storage and transport for background jobs
+
+    Payloads are plain JSON-compatible dicts and jobs round-trip through
+    ``Job.model_dump_json()``, so an out-of-process backend (Redis, SQLite)
+    can implement this interface and let API and worker processes scale
+    separately.
+    """
+
+    # Whether other processes see the same jobs (required for an API-only tier)
+    shared = False
+
+    async def close(self) -> None:
+        """Release connections"""
+
+    @abstractmethod
+    async def enqueue(self, job: Job, payload: Dict[str, Any]) -> None:
+        """Persist a new job and make it available to workers"""
+
+    @abstractmethod
+    async def dequeue(self) -> Tuple[str, Dict[str, Any]]:
+        """Block until a job is available and return its id and payload"""
+
+    @abstractmethod
+    async def get(self, job_id: str) -> Optional[Job]:
+        """Return the current state of a job"""
+
+    @abstractmethod
+    async def save(self, job: Job) -> None:
+        """Persist updated job state"""
+
+    def depth(self) -> Optional[int]:
+        """Jobs waiting for a worker, if the backend can tell cheaply"""
+        return None
+
+
+class InMemoryJobBackend(JobBackend):
+    """
+    Single-process backend: jobs live in a dict and an asyncio queue
+
+    Finished jobs are dropped ``ttl`` seconds after they finish.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.jobs: Dict[str, Job] = {}
+        # Finish time per finished job, oldest first
+        self.finished: Dict[str, float] = {}
+        self.queue: Optional[asyncio.Queue] = None
+
+    def _queue(self) -> asyncio.Queue:
+        # Created lazily so it binds to the running event loop
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        return self.queue
+
+    async def enqueue(self, job: Job, payload: Dict[str, Any]) -> None:
+        self.jobs[job.id] = job
+        await self._queue().put((job.id, payload))
+
+    async def dequeue(self) -> Tuple[str, Dict[str, Any]]:
+        return await self._queue().get()
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    async def save(self, job: Job) -> None:
+        self.jobs[job.id] = job
+        if job.status in (JobStatus.COMPLETED, JobStatus.FAILED):
+            self.finished.pop(job.id, None)
+            self.finished[job.id] = time.time()
+        self._expire()
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.ttl
+        for job_id, finished_at in list(self.finished.items()):
+            if finished_at > cutoff:
+                break
+            del self.finished[job_id]
+            self.jobs.pop(job_id, None)
+
+    def depth(self) -> Optional[int]:
+        return self.queue.qsize() if self.queue is not None else 0
+
+
+SQLITE_JOBS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    claimed_at REAL,
+    finished INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_waiting ON jobs (finished, claimed_at, created_at);
+"""
+
+
+class SQLiteJobBackend(JobBackend):
+    """
+    Jobs in a SQLite table shared by every process on the host
+
+    API processes (``JOB_WORKERS=0``) enqueue and read jobs while workers,
+    in-process or ``python -m backend.worker``, claim them with a
+    conditional UPDATE so each job runs once. Saving a job renews its claim;
+    a job whose claim is older than ``job_lease`` (its worker died) is
+    handed out again. Finished jobs are deleted ``ttl`` seconds after they
+    finish.
+    """
+
+    shared = True
+
+    def __init__(self, path: str, poll_interval: float, lease: float, ttl: float):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.ttl = ttl
+        self.db = None
+        self.lock = asyncio.Lock()
+        self.waiting: Optional[int] = None
+        # Wakes local workers right away for jobs submitted by this process
+        self.submitted: Optional[asyncio.Event] = None
+
+    async def _db(self):
+        if self.db is None:
+            async with self.lock:
+                if self.db is None:
+                    import aiosqlite
+
+                    db = await aiosqlite.connect(self.path)
+                    await db.execute("PRAGMA journal_mode=WAL")
+                    await db.execute("PRAGMA busy_timeout=5000")
+                    await db.executescript(SQLITE_JOBS_SCHEMA)
+                    await db.commit()
+                    self.db = db
+        return self.db
+
+    async def close(self) -> None:
+        if self.db is not None:
+            await self.db.close()
+            self.db = None
+
+    def _event(self) -> asyncio.Event:
+        if self.submitted is None:
+            self.submitted = asyncio.Event()
+        return self.submitted
+
+    async def enqueue(self, job: Job, payload: Dict[str, Any]) -> None:
+        db = await self._db()
+        await db.execute(
+            "INSERT INTO jobs (id, payload, data, created_at) VALUES (?, ?, ?, ?)",
+            (job.id, json.dumps(payload), job.model_dump_json(), time.time()),
+        )
+        await db.commit()
+        self._event().set()
+
+    async def _claim(self) -> Optional[Tuple[str, Dict[str, Any]]]:
+        db = await self._db()
+        stale = time.time() - self.lease
+        async with db.execute(
+            "SELECT id, payload FROM jobs WHERE finished = 0 "
+            "AND (claimed_at IS NULL OR claimed_at < ?) ORDER BY created_at LIMIT 8",
+            (stale,),
+        ) as cursor:
+            candidates = await cursor.fetchall()
+        for job_id, payload in candidates:
+            # Another worker may claim the same row first; only one UPDATE wins
+            cursor = await db.execute(
+                "UPDATE jobs SET claimed_at = ? WHERE id = ? AND finished = 0 "
+                "AND (claimed_at IS NULL OR claimed_at < ?)",
+                (time.time(), job_id, stale),
+            )
+            await db.commit()
+            if cursor.rowcount:
+                return job_id, json.loads(payload)
+        return None
+
+    async def dequeue(self) -> Tuple[str, Dict[str, Any]]:
+        while True:
+            claimed = await self._claim()
+            await self._count_waiting()
+            if claimed:
+                return claimed
+            event = self._event()
+            event.clear()
+            try:
+                await asyncio.wait_for(event.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _count_waiting(self) -> None:
+        db = await self._db()
+        async with db.execute(
+            "SELECT COUNT(*) FROM jobs WHERE finished = 0 AND claimed_at IS NULL"
+        ) as cursor:
+            self.waiting = (await cursor.fetchone())[0]
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        db = await self._db()
+        async with db.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)) as cursor:
+            row = await cursor.fetchone()
+        return Job.model_validate_json(row[0]) if row else None
+
+    async def save(self, job: Job) -> None:
+        db = await self._db()
+        finished = job.status in (JobStatus.COMPLETED, JobStatus.FAILED)
+        # Only the claiming worker saves, so this also renews its claim
+        await db.execute(
+            "UPDATE jobs SET data = ?, finished = ?, claimed_at = ? WHERE id = ?",
+            (job.model_dump_json(), int(finished), time.time(), job.id),
+        )
+        if finished:
+            # claimed_at of a finished job is when it finished
+            await db.execute(
+                "DELETE FROM jobs WHERE finished = 1 AND claimed_at < ?",
+                (time.time() - self.ttl,),
+            )
+        await db.commit()
+
+    def depth(self) -> Optional[int]:
+        # Refreshed whenever a worker polls
+        return self.waiting
+
+
+class JobQueue:
+    def __init__(self, backend: JobBackend):
+        self.backend = backend
+        self.handlers: Dict[str, JobHandler] = {}
+        self.workers: List[asyncio.Task] = []
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        """Register the handler that runs jobs of the given kind"""
+        self.handlers[kind] = handler
+
+    async def submit(self, kind: str, total: int, payload: Dict[str, Any]) -> Job:
+        """
+        Queue a job and return it immediately
+
+        With ``job_inline`` (serverless hosts, where background workers may
+        never run) the job runs in the request and is returned finished.
+        """
+        job = Job(id=str(uuid.uuid4()), kind=kind, total=total, posts=[None] * total)
+        if settings.job_inline:
+            await self._execute(job, payload)
+            return job
+        await self.backend.enqueue(job, payload)
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await self.backend.get(job_id)
+
+    async def report(self, job: Job, index: int, post: Post) -> None:
+        """Record a finished post as a partial result of the job"""
+        job.posts[index] = post
+        if post.status == PostStatus.FAILED:
+            job.failed += 1
+        else:
+            job.completed += 1
+        job.updated_at = datetime.now()
+        await self.backend.save(job)
+
+    async def _run(self, job_id: str, payload: Dict[str, Any]) -> None:
+        job = await self.backend.get(job_id)
+        if job is not None:
+            await self._execute(job, payload)
+
+    async def _execute(self, job: Job, payload: Dict[str, Any]) -> None:
+        # A job reclaimed from a dead worker starts over
+        job.status = JobStatus.RUNNING
+        job.posts = [None] * job.total
+        job.completed = job.failed = 0
+        job.updated_at = datetime.now()
+        await self.backend.save(job)
+
+        with tracer.start_as_current_span(
+            f"job {job.kind}", attributes={"job.id": job.id, "job.total": job.total}
+        ):
+            try:
+                job.result_id = await self.handlers[job.kind](job, payload)
+                job.status = JobStatus.COMPLETED
+            except Exception as e:
+                job.status = JobStatus.FAILED
+                job.error = str(e)
+                logger.exception("Job failed", extra={"job_id": job.id, "job_kind": job.kind})
+
+        job.updated_at = datetime.now()
+        await self.backend.save(job)
+
+    async def _work(self) -> None:
+        while True:
+            job_id, payload = await self.backend.dequeue()
+            await self._run(job_id, payload)
+
+    def start(self, workers: Optional[int] = None) -> None:
+        """
+        Start in-process workers on the running event loop
+
+        Raises:
+            RuntimeError: No workers with a backend other processes can't see,
+                so submitted jobs would never run
+        """
+        if settings.job_inline:
+            return
+        count = settings.job_workers if workers is None else workers
+        if count == 0 and not self.backend.shared:
+            raise RuntimeError(
+                "JOB_WORKERS=0 needs a shared JOB_BACKEND (sqlite); "
+                "jobs in the memory backend would never run"
+            )
+        for _ in range(count):
+            self.workers.append(asyncio.create_task(self._work()))
+
+    async def stop(self) -> None:
+        """Cancel in-process workers and release the backend"""
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        await self.backend.close()
+
+
+def get_job_backend(name: str) -> JobBackend:
+    """Create the job backend configured by ``settings.job_backend``"""
+    if name == "memory":
+        return InMemoryJobBackend(settings.job_ttl)
+    if name == "sqlite":
+        return SQLiteJobBackend(
+            settings.job_sqlite_path or settings.sqlite_path,
+            settings.job_poll_interval,
+            settings.job_lease,
+            settings.job_ttl,
+        )
+    raise ValueError(f"Unknown job backend: {name}")
+
+
+job_queue = JobQueue(get_job_backend(settings.job_backend))
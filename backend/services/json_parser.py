@@ -0,0 +1,208 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+CLOSERS = {"{": "}", "[": "]"}
+
+
+class IncrementalJSONParser:
+    """
+    Tolerant, incremental parser for JSON produced by a language model
+
+    Text is fed in chunks as it arrives. Anything before the first ``{`` or
+    ``[`` (prose, a Markdown fence) and after the end of the top-level value
+    is ignored. ``value()`` returns the best parse of what has been seen so
+    far: a truncated document is closed at the last complete value, and a
+    string still being written is returned as far as it goes. For a
+    top-level object, ``completed`` lists the keys whose values are final,
+    in the order they finished; for a top-level array, ``items`` counts the
+    elements that are final.
+    """
+
+    def __init__(self):
+        self.buffer: List[str] = []
+        self.length = 0
+        self.started = False
+        self.done = False
+        # One [bracket, state] per open container; states: "key", "colon",
+        # "value", "after" (a value just ended)
+        self.stack: List[List[str]] = []
+        self.in_string = False
+        self.escape = False
+        self.string_is_key = False
+        self.string_start = 0
+        self.key: Optional[str] = None
+        self.completed: List[str] = []
+        self.items = 0
+        # (buffer length, open brackets) where closing the brackets yields valid JSON
+        self.safe_point: Optional[Tuple[int, str]] = None
+
+    def feed(self, chunk: str) -> None:
+        for char in chunk:
+            if self.done:
+                return
+            if not self.started:
+                if char not in "{[":
+                    continue
+                self.started = True
+            self._consume(char)
+
+    def _brackets(self) -> str:
+        return "".join(level[0] for level in self.stack)
+
+    def _mark_safe(self) -> None:
+        self.safe_point = (self.length, self._brackets())
+
+    def _value_ended(self) -> None:
+        """A value finished at the current level"""
+        if not self.stack:
+            self.done = True
+            return
+        self.stack[-1][1] = "after"
+        if len(self.stack) == 1 and self.stack[0][0] == "[":
+            self.items += 1
+        if len(self.stack) == 1 and self.stack[0][0] == "{" and self.key is not None:
+            if self.key not in self.completed:
+                self.completed.append(self.key)
+        self._mark_safe()
+
+    def _append(self, char: str) -> None:
+        self.buffer.append(char)
+        self.length += 1
+
+    def _consume(self, char: str) -> None:
+        if self.in_string:
+            self._append(char)
+            if self.escape:
+                self.escape = False
+            elif char == "\\":
+                self.escape = True
+            elif char == '"':
+                self.in_string = False
+                if self.string_is_key:
+                    self.stack[-1][1] = "colon"
+                    if len(self.stack) == 1:
+                        raw = "".join(self.buffer[self.string_start : self.length])
+                        try:
+                            self.key = json.loads(raw)
+                        except ValueError:
+                            self.key = None
+                else:
+                    self._value_ended()
+            return
+
+        top = self.stack[-1] if self.stack else None
+        if char in "{[":
+            self._append(char)
+            self.stack.append([char, "key" if char == "{" else "value"])
+            self._mark_safe()
+        elif char in "}]":
+            if not top or CLOSERS[top[0]] != char:
+                # Mismatched bracket: treat the document as ended here
+                self.done = True
+                return
+            if top[1] == "colon":
+                # Dangling key; the closer would make this invalid
+                return
+            if top[1] == "value" and self._in_literal():
+                self._value_ended()
+            self._drop_trailing_comma()
+            self._append(char)
+            self.stack.pop()
+            self._value_ended()
+        elif char == '"':
+            self.string_is_key = top is not None and top[0] == "{" and top[1] == "key"
+            self.string_start = self.length
+            self.in_string = True
+            self._append(char)
+        elif char == ":":
+            self._append(char)
+            if top and top[1] == "colon":
+                top[1] = "value"
+        elif char == ",":
+            if top and top[1] == "value" and self._in_literal():
+                # A number or literal ends at the comma
+                self._value_ended()
+            if top and top[1] == "after":
+                self._append(char)
+                top[1] = "key" if top[0] == "{" else "value"
+            # A comma without a preceding value (e.g. "[,") is dropped
+        elif char.isspace():
+            if top and top[1] == "value" and self._in_literal():
+                self._value_ended()
+            self._append(char)
+        else:
+            self._append(char)
+
+    def _drop_trailing_comma(self) -> None:
+        index = self.length - 1
+        while index >= 0 and self.buffer[index].isspace():
+            index -= 1
+        if index >= 0 and self.buffer[index] == ",":
+            del self.buffer[index]
+            self.length -= 1
+
+    def _in_literal(self) -> bool:
+        """Whether the buffer ends in a bare number, true, false or null"""
+        index = self.length - 1
+        while index >= 0 and self.buffer[index] not in ":,[{ \t\r\n":
+            index -= 1
+        return index < self.length - 1
+
+    def value(self) -> Any:
+        """Best-effort parse of the input so far, or None if nothing is usable"""
+        if not self.started:
+            return None
+        text = "".join(self.buffer)
+        candidates = []
+        if self.in_string and not self.string_is_key:
+            # Close the string being written so its prefix is visible
+            partial = text[:-1] if self.escape else text
+            candidates.append(partial + '"' + self._closers(self._brackets()))
+        elif self.stack and self.stack[-1][1] == "value" and self._in_literal():
+            candidates.append(text + self._closers(self._brackets()))
+        if self.safe_point:
+            length, brackets = self.safe_point
+            candidates.append(text[:length] + self._closers(brackets))
+
+        for candidate in candidates:
+            try:
+                return json.loads(candidate)
+            except ValueError:
+                continue
+        return None
+
+    @staticmethod
+    def _closers(brackets: str) -> str:
+        return "".join(CLOSERS[bracket] for bracket in reversed(brackets))
+
+
+def parse_tolerant(text: str) -> Any:
+    """Parse model output that may be fenced, wrapped in prose or truncated"""
+    parser = IncrementalJSONParser()
+    parser.feed(text)
+    return parser.value()
+
+
+def parse_complete(text: str) -> Any:
+    """
+    Parse model output like ``parse_tolerant``, keeping only final values
+
+    A truncated answer keeps the top-level keys or array items that were
+    fully written; one cut off mid-value is dropped rather than returned as
+    if it were whole, so callers see it as missing.
+
+    >>> parse_complete('{"caption": "golden hour", "image_prompt": "woman on a bea')
+    {'caption': 'golden hour'}
+    >>> parse_complete('[{"caption": "a"}, {"caption": "b')
+    [{'caption': 'a'}]
+    >>> parse_complete('Here you go: {"caption": "a", "hashtags": ["x"]}')
+    {'caption': 'a', 'hashtags': ['x']}
+    """
+    parser = IncrementalJSONParser()
+    parser.feed(text)
+    value = parser.value()
+    if isinstance(value, dict):
+        return {key: value[key] for key in parser.completed if key in value}
+    if isinstance(value, list):
+        return value[: parser.items]
+    return value if parser.done else None
@@ -0,0 +1,59 @@
+import hashlib
+from typing import Any, Iterable, List, Mapping, Optional
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+# Listings change whenever anything is written, so clients must revalidate
+REVALIDATE = "no-cache"
+
+
+class RawJSONResponse(Response):
+    """A response whose body is already serialized JSON"""
+
+    media_type = "application/json"
+
+
+def join_json(items: Iterable[bytes]) -> bytes:
+    """A JSON array from already serialized elements"""
+    return b"[" + b",".join(items) + b"]"
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag over the given parts (revisions, query strings or a body)"""
+    digest = hashlib.blake2b(digest_size=12)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\x00")
+    return f'W/"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches ``etag`` (weak comparison)"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in tags)
+
+
+def dump_list(items: List[Any]) -> bytes:
+    """Serialize a page of models, or of projected dicts, as a JSON array"""
+    return join_json(
+        item.model_dump_json().encode() if isinstance(item, BaseModel) else orjson.dumps(item)
+        for item in items
+    )
+
+
+def json_response(
+    body: bytes, etag: str, headers: Optional[Mapping[str, str]] = None
+) -> Response:
+    """Serve serialized JSON with its ETag"""
+    return RawJSONResponse(
+        content=body, headers={**(headers or {}), "ETag": etag, "Cache-Control": REVALIDATE}
+    )
+
+
+def not_modified(etag: str) -> Response:
+    """A bodiless 304 for a client that already has this version"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE})
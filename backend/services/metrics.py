@@ -0,0 +1,146 @@
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import REGISTRY, Collector
+
+# Upstream calls are seconds long; HTTP requests range from sub-ms to minutes
+UPSTREAM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+ENCODE_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+UPSTREAM_SECONDS = Histogram(
+    "orchestrator_upstream_request_seconds",
+    "Duration of each upstream model call attempt",
+    ["model", "outcome"],
+    buckets=UPSTREAM_BUCKETS,
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "orchestrator_upstream_in_flight",
+    "Upstream model calls currently running",
+    ["upstream"],
+)
+GENERATIONS_IN_FLIGHT = Gauge(
+    "orchestrator_generations_in_flight",
+    "Caption and image generations currently running (after coalescing)",
+    ["kind"],
+)
+IMAGE_PROCESS_SECONDS = Histogram(
+    "orchestrator_image_process_seconds",
+    "Time to prepare (sniff or transcode) an image or render a thumbnail",
+    ["operation"],
+    buckets=ENCODE_BUCKETS,
+)
+CAPTION_PARSE_RESULTS = Counter(
+    "orchestrator_caption_parse",
+    "Parsed caption responses: valid, repaired locally, retried (extra call), "
+    "fallback or failed",
+    ["kind", "outcome"],
+)
+CAPTION_FIELD_REPAIRS = Counter(
+    "orchestrator_caption_field_repairs",
+    "Caption fields requested again because the model's answer was invalid",
+    ["field"],
+)
+HTTP_SECONDS = Histogram(
+    "orchestrator_http_request_seconds",
+    "HTTP request duration by route, including streamed bodies",
+    ["method", "route", "status"],
+    buckets=HTTP_BUCKETS,
+)
+HTTP_RESPONSE_BYTES = Histogram(
+    "orchestrator_http_response_bytes",
+    "HTTP response body size by route",
+    ["method", "route"],
+    buckets=SIZE_BUCKETS,
+)
+
+
+class StatsCollector(Collector):
+    """
+    Exposes counters the services already keep through their ``stats()``
+
+    Read at scrape time, so the request path pays nothing for them.
+    """
+
+    def __init__(self):
+        self.caches: Dict[str, Callable[[], Optional[Dict]]] = {}
+        self.queues: Dict[str, Callable[[], Optional[int]]] = {}
+
+    def add_cache(self, name: str, stats: Callable[[], Optional[Dict]]) -> None:
+        self.caches[name] = stats
+
+    def add_queue(self, name: str, depth: Callable[[], Optional[int]]) -> None:
+        self.queues[name] = depth
+
+    def collect(self) -> Iterable:
+        hits = CounterMetricFamily(
+            "orchestrator_cache_hits", "Cache lookups served from the cache", labels=["cache"]
+        )
+        misses = CounterMetricFamily(
+            "orchestrator_cache_misses", "Cache lookups that went upstream", labels=["cache"]
+        )
+        for name, stats in self.caches.items():
+            values = stats()
+            if values is None:
+                continue
+            hits.add_metric([name], values["hits"])
+            misses.add_metric([name], values["misses"])
+        yield hits
+        yield misses
+
+        depth = GaugeMetricFamily(
+            "orchestrator_queue_depth", "Items waiting in a queue", labels=["queue"]
+        )
+        for name, size in self.queues.items():
+            value = size()
+            if value is not None:
+                depth.add_metric([name], value)
+        yield depth
+
+
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every request by its route template
+
+    Time runs until the last body chunk is sent, so streaming endpoints
+    report their full duration. Unmatched paths are grouped as "unmatched"
+    to keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_SECONDS.labels(method, path, str(status)).observe(
+                time.perf_counter() - started
+            )
+            HTTP_RESPONSE_BYTES.labels(method, path).observe(size)
@@ -0,0 +1,65 @@
+from typing import Any, List, Optional, Set, Tuple, Type
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel
+
+from backend.services.json_response import join_json
+from backend.services.repository import decode_cursor, encode_cursor, sort_key
+
+# Response header carrying the cursor of the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+
+def parse_cursor(cursor: Optional[str], by_schedule: bool = False) -> Optional[tuple]:
+    """Decode a cursor for the given ordering (see ``sort_key``), or answer 400"""
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor, by_schedule)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[Set[str]]:
+    """Parse a comma-separated ``fields=`` projection, rejecting unknown names"""
+    if not fields:
+        return None
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = names - set(model.model_fields)
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    return names
+
+
+def paginate(
+    response: Response,
+    items: List[Any],
+    limit: int,
+    fields: Optional[Set[str]] = None,
+    by_schedule: bool = False,
+) -> List[Any]:
+    """
+    Trim a page fetched with ``limit + 1`` items, set the next-page cursor
+    header and apply the field projection
+    """
+    if len(items) > limit:
+        items = items[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            sort_key(items[-1], by_schedule)
+        )
+    if fields is None:
+        return items
+    return [item.model_dump(mode="json", include=fields) for item in items]
+
+
+def paginate_json(response: Response, rows: List[Tuple[tuple, bytes]], limit: int) -> bytes:
+    """``paginate`` for (sort key, serialized item) pairs, returning the JSON array"""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1][0])
+    return join_json(body for _, body in rows)
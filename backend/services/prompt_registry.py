@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import time
+from functools import lru_cache
+from string import Template
+from typing import Any, Dict, List, Optional
+
+from backend.config import settings
+from backend.models import TemplateType
+from backend.services.tracing import logger
+
+DEFAULT_PROMPT_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "prompts")
+
+PROMPT_FILES = (
+    "templates.json",
+    "caption_prefix.txt",
+    "caption_request.txt",
+    "batch_instructions.txt",
+    "repair_request.txt",
+    "image_suffix.txt",
+    "negative_prompt.txt",
+)
+
+
+class PromptRegistry:
+    """
+    Prompt templates loaded once from ``backend/prompts``
+
+    The caption prompt is split into a per-template prefix, rendered once at
+    load time and identical for every request of that template (so it can
+    be context-cached), and a short request part with the variable slots.
+    Files are re-read when they change on disk, checked at most every
+    ``reload_interval`` seconds (0 disables hot reload).
+    """
+
+    def __init__(self, directory: str, reload_interval: float = 0):
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self.checked_at = time.monotonic()
+        self.mtimes: Dict[str, float] = {}
+        self.load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _read(self, name: str) -> str:
+        with open(self._path(name), encoding="utf-8") as f:
+            return f.read()
+
+    def load(self) -> None:
+        """(Re)load every prompt file; the previous prompts stay on error"""
+        mtimes = {name: os.path.getmtime(self._path(name)) for name in PROMPT_FILES}
+        texts = {name: self._read(name) for name in PROMPT_FILES}
+
+        configs = {
+            TemplateType(name): config
+            for name, config in json.loads(texts["templates.json"]).items()
+        }
+        prefix = Template(texts["caption_prefix.txt"])
+        prefixes = {
+            template_type: prefix.substitute(
+                template_name=template_type.value.replace("_", " "),
+                style=config["style"],
+                tone=config["tone"],
+                content_focus=config["content_focus"],
+            )
+            for template_type, config in configs.items()
+        }
+
+        self.configs = configs
+        self.prefixes = prefixes
+        self.request = Template(texts["caption_request.txt"])
+        self.batch = Template(texts["batch_instructions.txt"])
+        self.repair = Template(texts["repair_request.txt"])
+        self.image_suffix = texts["image_suffix.txt"].strip()
+        self.negative_prompt = texts["negative_prompt.txt"].strip()
+        self.version = hashlib.sha256(
+            "\0".join(texts[name] for name in PROMPT_FILES).encode()
+        ).hexdigest()[:12]
+        self.mtimes = mtimes
+
+    def refresh(self) -> None:
+        """Reload if a prompt file changed since the last check"""
+        if self.reload_interval <= 0:
+            return
+        now = time.monotonic()
+        if now - self.checked_at < self.reload_interval:
+            return
+        self.checked_at = now
+        try:
+            changed = any(
+                os.path.getmtime(self._path(name)) != mtime
+                for name, mtime in self.mtimes.items()
+            )
+            if changed:
+                self.load()
+                logger.info("Prompts reloaded", extra={"prompt_version": self.version})
+        except Exception:
+            logger.warning(
+                "Could not reload prompts", exc_info=True, extra={"prompt_dir": self.directory}
+            )
+
+    def template_config(self, template_type: TemplateType) -> Dict[str, str]:
+        self.refresh()
+        return self.configs.get(template_type, self.configs[TemplateType.VIRTUAL_INFLUENCER])
+
+    def caption_prefix(self, template_type: TemplateType) -> str:
+        """Static, cacheable part of the caption prompt for a template"""
+        self.refresh()
+        return self.prefixes.get(template_type, self.prefixes[TemplateType.VIRTUAL_INFLUENCER])
+
+    def caption_request(
+        self,
+        template_type: TemplateType,
+        custom_prompt: Optional[str] = None,
+        tone: str = "professional",
+        variation: Optional[str] = None,
+    ) -> str:
+        """Variable part of the caption prompt, appended to the prefix"""
+        guidance = []
+        if template_type == TemplateType.CUSTOM and custom_prompt:
+            guidance.append(f"USER REQUEST: {custom_prompt}")
+            guidance.append(
+                "Follow the user's request closely and create appropriate content "
+                "that matches their vision."
+            )
+        elif custom_prompt:
+            guidance.append(f"Additional guidance: {custom_prompt}")
+        if variation:
+            guidance.append(f"Variation: {variation}. Make this version distinct.")
+        return self.request.substitute(tone=tone, guidance="\n".join(guidance))
+
+    def batch_instructions(self, size: int, first: int, last: int, total: int) -> str:
+        return self.batch.substitute(size=size, first=first, last=last, total=total)
+
+    def repair_instructions(self, existing: Dict[str, Any], fields: List[str]) -> str:
+        """Ask again for only ``fields``, given the parts already accepted"""
+        return self.repair.substitute(
+            existing=json.dumps(existing, ensure_ascii=False, indent=2),
+            fields=", ".join(fields),
+        )
+
+    def image_prompt(self, prompt: str) -> str:
+        self.refresh()
+        return f"{prompt}, {self.image_suffix}"
+
+
+@lru_cache()
+def get_prompt_registry() -> PromptRegistry:
+    """Shared PromptRegistry, loaded on first use"""
+    return PromptRegistry(
+        settings.prompt_dir or DEFAULT_PROMPT_DIR, settings.prompt_reload_interval
+    )
@@ -0,0 +1,74 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Deque, Optional
+
+from backend.config import settings
+from backend.models import Post
+from backend.services.tracing import logger
+
+
+class Publisher(ABC):
+    """Destination that due posts are handed to by the scheduler"""
+
+    # False for stubs that send nothing; the scheduler refuses to run with them
+    delivers = True
+
+    @abstractmethod
+    async def publish(self, post: Post) -> None:
+        """Publish a post; raise to mark it failed"""
+
+    async def close(self) -> None:
+        """Release connections"""
+
+
+class LocalPublisher(Publisher):
+    """Stub publisher for tests: records the latest posts and delivers nothing"""
+
+    delivers = False
+
+    def __init__(self, history: int = 100):
+        self.published: Deque[Post] = deque(maxlen=history)
+
+    async def publish(self, post: Post) -> None:
+        self.published.append(post)
+        logger.info(
+            "Published post", extra={"post_id": post.id, "campaign_id": post.campaign_id}
+        )
+
+
+class WebhookPublisher(Publisher):
+    """POSTs each post as JSON to a URL; any non-2xx answer fails the post"""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        try:
+            import httpx
+        except ImportError as e:
+            raise RuntimeError("Webhook publisher requires httpx (pip install httpx)") from e
+
+        self.url = url
+        self.client = httpx.AsyncClient(timeout=timeout)
+
+    async def publish(self, post: Post) -> None:
+        response = await self.client.post(
+            self.url,
+            content=post.model_dump_json(),
+            headers={"Content-Type": "application/json"},
+        )
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def get_publisher(name: str, webhook_url: Optional[str] = None) -> Publisher:
+    """Create the publisher configured by ``settings.publisher``"""
+    if name == "local":
+        return LocalPublisher()
+    if name == "webhook":
+        if not webhook_url:
+            raise ValueError("PUBLISHER_WEBHOOK_URL is required for the webhook publisher")
+        return WebhookPublisher(webhook_url)
+    raise ValueError(f"Unknown publisher: {name}")
+
+
+publisher = get_publisher(settings.publisher, settings.publisher_webhook_url)
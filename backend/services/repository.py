@@ -0,0 +1,891 @@
+import asyncio
+import base64
+import bisect
+import json
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple, Union
+
+from backend.config import settings
+from backend.models import Campaign, Post, PostStatus, TemplateType
+
+
+# Blob key in an image URL served by the images endpoint
+IMAGE_KEY_PATTERN = re.compile(r"/api/images/([^/?#]+)")
+
+
+def image_keys(post: Post) -> Set[str]:
+    """Blob keys of a post's image and image variants"""
+    keys = set()
+    for url in [post.image_url] + [variant.url for variant in post.image_variants]:
+        match = IMAGE_KEY_PATTERN.search(url or "")
+        if match:
+            keys.add(match.group(1))
+    return keys
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    """Sort key for datetimes; naive values are treated as local time"""
+    return value.timestamp() if value else None
+
+
+def sort_key(item: Union[Post, Campaign], by_schedule: bool = False) -> tuple:
+    """
+    Total order used for listing and cursors
+
+    Newest-last by creation time, or by slot time for the posts of a
+    campaign; the id breaks ties so cursors are stable.
+    """
+    if by_schedule:
+        return (_timestamp(item.scheduled_at) or 0.0, _timestamp(item.created_at), item.id)
+    return (_timestamp(item.created_at), item.id)
+
+
+def _discard_sorted(items: List[tuple], entry: tuple) -> None:
+    """Remove ``entry`` from a sorted list, if present"""
+    i = bisect.bisect_left(items, entry)
+    if i < len(items) and items[i] == entry:
+        del items[i]
+
+
+def encode_cursor(key: tuple) -> str:
+    """Opaque cursor for the position right after ``key``"""
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str, by_schedule: bool = False) -> tuple:
+    """
+    Inverse of ``encode_cursor`` for the ``sort_key`` of the same ordering
+
+    Raises ValueError for malformed cursors, including keys whose shape
+    doesn't match the ordering: (created, id) or (scheduled, created, id).
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(key, list) or len(key) != (3 if by_schedule else 2):
+        raise ValueError("Invalid cursor")
+    *timestamps, item_id = key
+    # JSON gives whole-second timestamps back as ints; bools are ints too
+    if not isinstance(item_id, str) or not all(
+        isinstance(t, (int, float)) and not isinstance(t, bool) for t in timestamps
+    ):
+        raise ValueError("Invalid cursor")
+    return (*(float(t) for t in timestamps), item_id)
+
+
+class Repository(ABC):
+    """
+    Storage for posts and campaigns
+
+    Campaign posts are stored alongside standalone posts (with ``campaign_id``
+    set) and re-attached when a campaign is loaded. Returned objects are
+    copies: call ``update_*`` to persist changes.
+
+    Every write bumps the revision of the table it touches ("posts" or
+    "campaigns"), which read endpoints use as their ETag.
+    """
+
+    async def connect(self) -> None:
+        """Open connections and create the schema if needed"""
+
+    async def close(self) -> None:
+        """Release connections"""
+
+    @abstractmethod
+    async def add_post(self, post: Post) -> None:
+        """Insert or replace a post"""
+
+    @abstractmethod
+    async def get_post(self, post_id: str) -> Optional[Post]:
+        """Return a post by id"""
+
+    @abstractmethod
+    async def delete_post(self, post_id: str) -> bool:
+        """Delete a post, returning whether it existed"""
+
+    @abstractmethod
+    async def list_posts(
+        self,
+        *,
+        status: Optional[PostStatus] = None,
+        template_type: Optional[TemplateType] = None,
+        scheduled_from: Optional[datetime] = None,
+        scheduled_to: Optional[datetime] = None,
+        campaign_id: Optional[str] = None,
+        standalone: bool = False,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+    ) -> List[Post]:
+        """
+        Return posts matching every given filter, oldest first
+
+        Args:
+            scheduled_from: Inclusive lower bound on ``scheduled_at``
+            scheduled_to: Exclusive upper bound on ``scheduled_at``
+            campaign_id: Only posts of this campaign, in slot order
+            standalone: Only posts that don't belong to a campaign
+            after: Only posts whose ``sort_key`` is greater (a decoded cursor)
+            limit: Maximum number of posts to return
+        """
+
+    @abstractmethod
+    async def add_campaign(self, campaign: Campaign) -> None:
+        """Insert or replace a campaign and its posts"""
+
+    @abstractmethod
+    async def get_campaign(
+        self, campaign_id: str, with_posts: bool = True
+    ) -> Optional[Campaign]:
+        """Return a campaign by id, with its posts unless ``with_posts`` is False"""
+
+    @abstractmethod
+    async def update_campaign(self, campaign: Campaign) -> None:
+        """Persist campaign fields (not its posts)"""
+
+    @abstractmethod
+    async def delete_campaign(self, campaign_id: str) -> bool:
+        """Delete a campaign and its posts, returning whether it existed"""
+
+    @abstractmethod
+    async def list_campaigns(
+        self,
+        *,
+        status: Optional[str] = None,
+        template_type: Optional[TemplateType] = None,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+        with_posts: bool = True,
+    ) -> List[Campaign]:
+        """
+        Return campaigns matching every given filter, oldest first
+
+        Args:
+            after: Only campaigns whose ``sort_key`` is greater (a decoded cursor)
+            limit: Maximum number of campaigns to return
+            with_posts: Attach each campaign's posts; skip to keep listings light
+        """
+
+    async def update_post(self, post: Post) -> None:
+        """Persist changes to an existing post"""
+        await self.add_post(post)
+
+    @abstractmethod
+    async def revision(self, table: str) -> int:
+        """Version counter of "posts" or "campaigns"; changes on every write"""
+
+    @abstractmethod
+    async def image_in_use(self, key: str) -> bool:
+        """Whether any post's image or image variants use the blob ``key``"""
+
+    async def get_post_json(self, post_id: str) -> Optional[bytes]:
+        """Return a post serialized as the API sends it"""
+        post = await self.get_post(post_id)
+        return post.model_dump_json().encode() if post else None
+
+    async def list_posts_json(self, **filters) -> List[Tuple[tuple, bytes]]:
+        """
+        ``list_posts`` as (sort key, serialized post) pairs
+
+        Lets listings be served without validating and re-serializing every
+        post; takes the same filters as ``list_posts``.
+        """
+        by_schedule = filters.get("campaign_id") is not None
+        return [
+            (sort_key(post, by_schedule), post.model_dump_json().encode())
+            for post in await self.list_posts(**filters)
+        ]
+
+    @abstractmethod
+    async def transition_post(
+        self,
+        post_id: str,
+        expected: PostStatus,
+        status: PostStatus,
+        error: Optional[str] = None,
+        published_at: Optional[datetime] = None,
+        claimed_at: Optional[datetime] = None,
+        content: Optional[Post] = None,
+    ) -> Optional[Post]:
+        """
+        Atomically move a post from ``expected`` to ``status`` (compare-and-set)
+
+        Used to claim a post so only one scheduler, in any worker, dispatches it.
+
+        Args:
+            claimed_at: When the post was claimed; None once it is released
+            content: Replace the post's other fields with this post's, e.g. to
+                save generated content only if the post is still claimed
+
+        Returns:
+            The updated post, or None if it is missing or not in ``expected``
+        """
+
+
+class InMemoryRepository(Repository):
+    """Dict-backed storage with secondary indexes for single-process use"""
+
+    def __init__(self):
+        self.posts: Dict[str, Post] = {}
+        self.campaigns: Dict[str, Campaign] = {}
+        self.posts_by_status: Dict[PostStatus, Set[str]] = defaultdict(set)
+        self.posts_by_template: Dict[TemplateType, Set[str]] = defaultdict(set)
+        self.posts_by_campaign: Dict[Optional[str], Set[str]] = defaultdict(set)
+        # Sorted (timestamp, id) pairs for scheduled_at range queries
+        self.posts_by_schedule: List[Tuple[float, str]] = []
+        # Sorted sort keys, so a page is a bisect plus a short walk
+        self.posts_by_created: List[tuple] = []
+        self.posts_by_slot: Dict[str, List[tuple]] = defaultdict(list)
+        self.campaigns_by_created: List[tuple] = []
+        # Posts using each image blob; blobs are content addressed and shared
+        self.image_refs: Dict[str, int] = defaultdict(int)
+        self.campaigns_by_status: Dict[str, Set[str]] = defaultdict(set)
+        self.campaigns_by_template: Dict[TemplateType, Set[str]] = defaultdict(set)
+        # Each post serialized once per write, for listings and detail reads
+        self.post_json: Dict[str, bytes] = {}
+        # Seeded from the clock so ETags issued before a restart don't match
+        self.revisions: Dict[str, int] = {"posts": time.time_ns(), "campaigns": time.time_ns()}
+
+    async def revision(self, table: str) -> int:
+        return self.revisions[table]
+
+    async def image_in_use(self, key: str) -> bool:
+        return self.image_refs.get(key, 0) > 0
+
+    def _store_post(self, post: Post) -> None:
+        self.post_json[post.id] = post.model_dump_json().encode()
+        self.revisions["posts"] += 1
+
+    def _index_post(self, post: Post) -> None:
+        self.posts_by_status[post.status].add(post.id)
+        self.posts_by_template[post.template_type].add(post.id)
+        self.posts_by_campaign[post.campaign_id].add(post.id)
+        if post.scheduled_at:
+            bisect.insort(self.posts_by_schedule, (_timestamp(post.scheduled_at), post.id))
+        bisect.insort(self.posts_by_created, sort_key(post))
+        if post.campaign_id is not None:
+            bisect.insort(self.posts_by_slot[post.campaign_id], sort_key(post, True))
+        for key in image_keys(post):
+            self.image_refs[key] += 1
+
+    def _unindex_post(self, post: Post) -> None:
+        self.posts_by_status[post.status].discard(post.id)
+        self.posts_by_template[post.template_type].discard(post.id)
+        self.posts_by_campaign[post.campaign_id].discard(post.id)
+        if post.scheduled_at:
+            _discard_sorted(self.posts_by_schedule, (_timestamp(post.scheduled_at), post.id))
+        _discard_sorted(self.posts_by_created, sort_key(post))
+        if post.campaign_id is not None:
+            _discard_sorted(self.posts_by_slot[post.campaign_id], sort_key(post, True))
+        for key in image_keys(post):
+            self.image_refs[key] -= 1
+            if self.image_refs[key] <= 0:
+                del self.image_refs[key]
+
+    @staticmethod
+    def _page(
+        index: List[tuple], ids: Optional[Set[str]], after: Optional[tuple], limit: Optional[int]
+    ) -> List[str]:
+        """
+        Ids from a sorted sort-key index, past the cursor and within ``ids``
+
+        Costs a bisect plus the entries walked, so paging through a whole
+        listing stays linear.
+        """
+        start = bisect.bisect_right(index, tuple(after)) if after is not None else 0
+        page: List[str] = []
+        for i in range(start, len(index)):
+            if limit is not None and len(page) >= limit:
+                break
+            item_id = index[i][-1]
+            if ids is None or item_id in ids:
+                page.append(item_id)
+        return page
+
+    async def add_post(self, post: Post) -> None:
+        existing = self.posts.get(post.id)
+        if existing:
+            self._unindex_post(existing)
+        stored = post.model_copy(deep=True)
+        self.posts[post.id] = stored
+        self._index_post(stored)
+        self._store_post(stored)
+
+    async def get_post(self, post_id: str) -> Optional[Post]:
+        post = self.posts.get(post_id)
+        return post.model_copy(deep=True) if post else None
+
+    async def get_post_json(self, post_id: str) -> Optional[bytes]:
+        return self.post_json.get(post_id)
+
+    async def delete_post(self, post_id: str) -> bool:
+        post = self.posts.pop(post_id, None)
+        if not post:
+            return False
+        self._unindex_post(post)
+        del self.post_json[post_id]
+        self.revisions["posts"] += 1
+        return True
+
+    async def list_posts(
+        self,
+        *,
+        status: Optional[PostStatus] = None,
+        template_type: Optional[TemplateType] = None,
+        scheduled_from: Optional[datetime] = None,
+        scheduled_to: Optional[datetime] = None,
+        campaign_id: Optional[str] = None,
+        standalone: bool = False,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+    ) -> List[Post]:
+        index, ids = self._select(
+            status, template_type, scheduled_from, scheduled_to, campaign_id, standalone
+        )
+        return [self.posts[i].model_copy(deep=True) for i in self._page(index, ids, after, limit)]
+
+    async def list_posts_json(
+        self,
+        *,
+        status: Optional[PostStatus] = None,
+        template_type: Optional[TemplateType] = None,
+        scheduled_from: Optional[datetime] = None,
+        scheduled_to: Optional[datetime] = None,
+        campaign_id: Optional[str] = None,
+        standalone: bool = False,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[tuple, bytes]]:
+        index, ids = self._select(
+            status, template_type, scheduled_from, scheduled_to, campaign_id, standalone
+        )
+        by_schedule = campaign_id is not None
+        # No copies: the stored posts are only read for their sort keys
+        posts = [self.posts[i] for i in self._page(index, ids, after, limit)]
+        return [(sort_key(p, by_schedule), self.post_json[p.id]) for p in posts]
+
+    def _select(
+        self,
+        status: Optional[PostStatus],
+        template_type: Optional[TemplateType],
+        scheduled_from: Optional[datetime],
+        scheduled_to: Optional[datetime],
+        campaign_id: Optional[str],
+        standalone: bool,
+    ) -> Tuple[List[tuple], Optional[Set[str]]]:
+        """
+        The sorted index to walk (by slot for a campaign, else by creation)
+        and the ids matching every other filter, or None for no filter
+        """
+        # A campaign's slot index only holds its own posts
+        index = (
+            self.posts_by_slot.get(campaign_id, [])
+            if campaign_id is not None
+            else self.posts_by_created
+        )
+        candidates: List[Set[str]] = []
+        if status is not None:
+            candidates.append(self.posts_by_status[status])
+        if template_type is not None:
+            candidates.append(self.posts_by_template[template_type])
+        if standalone:
+            candidates.append(self.posts_by_campaign[None])
+        if scheduled_from is not None or scheduled_to is not None:
+            lo = (
+                bisect.bisect_left(self.posts_by_schedule, (_timestamp(scheduled_from),))
+                if scheduled_from
+                else 0
+            )
+            hi = (
+                bisect.bisect_left(self.posts_by_schedule, (_timestamp(scheduled_to),))
+                if scheduled_to
+                else len(self.posts_by_schedule)
+            )
+            candidates.append({post_id for _, post_id in self.posts_by_schedule[lo:hi]})
+
+        if not candidates:
+            return index, None
+        if len(candidates) == 1:
+            # Only read, so the index set itself can be used
+            return index, candidates[0]
+
+        # Intersect starting from the most selective index
+        candidates.sort(key=len)
+        ids = candidates[0] & candidates[1]
+        for other in candidates[2:]:
+            ids &= other
+        return index, ids
+
+    async def transition_post(
+        self,
+        post_id: str,
+        expected: PostStatus,
+        status: PostStatus,
+        error: Optional[str] = None,
+        published_at: Optional[datetime] = None,
+        claimed_at: Optional[datetime] = None,
+        content: Optional[Post] = None,
+    ) -> Optional[Post]:
+        post = self.posts.get(post_id)
+        if not post or post.status != expected:
+            return None
+        self._unindex_post(post)
+        if content is not None:
+            post = self.posts[post_id] = content.model_copy(deep=True)
+        post.status = status
+        post.error = error
+        post.published_at = published_at
+        post.claimed_at = claimed_at
+        self._index_post(post)
+        self._store_post(post)
+        return post.model_copy(deep=True)
+
+    def _attach_posts(self, campaign: Campaign) -> Campaign:
+        campaign = campaign.model_copy()
+        campaign.posts = [
+            self.posts[i].model_copy(deep=True)
+            for i in self._page(self.posts_by_slot.get(campaign.id, []), None, None, None)
+        ]
+        return campaign
+
+    async def add_campaign(self, campaign: Campaign) -> None:
+        for post in campaign.posts:
+            post.campaign_id = campaign.id
+            await self.add_post(post)
+        await self.update_campaign(campaign)
+
+    async def get_campaign(
+        self, campaign_id: str, with_posts: bool = True
+    ) -> Optional[Campaign]:
+        campaign = self.campaigns.get(campaign_id)
+        if not campaign:
+            return None
+        return self._attach_posts(campaign) if with_posts else campaign.model_copy()
+
+    async def update_campaign(self, campaign: Campaign) -> None:
+        existing = self.campaigns.get(campaign.id)
+        if existing:
+            self.campaigns_by_status[existing.status].discard(existing.id)
+            self.campaigns_by_template[existing.template_type].discard(existing.id)
+            _discard_sorted(self.campaigns_by_created, sort_key(existing))
+        stored = campaign.model_copy(update={"posts": []})
+        self.campaigns[campaign.id] = stored
+        self.campaigns_by_status[stored.status].add(stored.id)
+        self.campaigns_by_template[stored.template_type].add(stored.id)
+        bisect.insort(self.campaigns_by_created, sort_key(stored))
+        self.revisions["campaigns"] += 1
+
+    async def delete_campaign(self, campaign_id: str) -> bool:
+        campaign = self.campaigns.pop(campaign_id, None)
+        if not campaign:
+            return False
+        self.campaigns_by_status[campaign.status].discard(campaign_id)
+        self.campaigns_by_template[campaign.template_type].discard(campaign_id)
+        _discard_sorted(self.campaigns_by_created, sort_key(campaign))
+        for post_id in list(self.posts_by_campaign[campaign_id]):
+            await self.delete_post(post_id)
+        self.revisions["campaigns"] += 1
+        return True
+
+    async def list_campaigns(
+        self,
+        *,
+        status: Optional[str] = None,
+        template_type: Optional[TemplateType] = None,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+        with_posts: bool = True,
+    ) -> List[Campaign]:
+        ids: Optional[Set[str]] = None
+        if status is not None:
+            ids = self.campaigns_by_status[status]
+        if template_type is not None:
+            by_template = self.campaigns_by_template[template_type]
+            ids = by_template if ids is None else ids & by_template
+        page = self._page(self.campaigns_by_created, ids, after, limit)
+        campaigns = [self.campaigns[i] for i in page]
+        if with_posts:
+            return [self._attach_posts(c) for c in campaigns]
+        return [c.model_copy() for c in campaigns]
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id TEXT PRIMARY KEY,
+    campaign_id TEXT,
+    status TEXT NOT NULL,
+    template_type TEXT NOT NULL,
+    scheduled_at REAL,
+    created_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS posts_status ON posts (status);
+CREATE INDEX IF NOT EXISTS posts_template_type ON posts (template_type);
+CREATE INDEX IF NOT EXISTS posts_scheduled_at ON posts (scheduled_at);
+CREATE INDEX IF NOT EXISTS posts_campaign_id ON posts (campaign_id, scheduled_at);
+CREATE INDEX IF NOT EXISTS posts_created_at ON posts (created_at, id);
+
+CREATE TABLE IF NOT EXISTS campaigns (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    template_type TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS campaigns_status ON campaigns (status);
+CREATE INDEX IF NOT EXISTS campaigns_template_type ON campaigns (template_type);
+CREATE INDEX IF NOT EXISTS campaigns_created_at ON campaigns (created_at, id);
+
+CREATE TABLE IF NOT EXISTS revisions (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class SQLiteRepository(Repository):
+    """
+    SQLite storage via aiosqlite
+
+    The database file can be shared by several uvicorn workers on one host;
+    WAL mode lets readers proceed while another worker writes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = None
+        self.lock = asyncio.Lock()
+        # Coroutines share the connection, so writes take turns in their own
+        # transaction instead of interleaving statements
+        self.write_lock = asyncio.Lock()
+
+    async def connect(self) -> None:
+        await self._db()
+
+    async def close(self) -> None:
+        if self.db is not None:
+            await self.db.close()
+            self.db = None
+
+    async def _db(self):
+        if self.db is None:
+            async with self.lock:
+                if self.db is None:
+                    import aiosqlite
+
+                    db = await aiosqlite.connect(self.path)
+                    await db.execute("PRAGMA journal_mode=WAL")
+                    await db.execute("PRAGMA busy_timeout=5000")
+                    await db.executescript(SQLITE_SCHEMA)
+                    # Seeded from the clock so a recreated file doesn't reuse ETags
+                    await db.executemany(
+                        "INSERT OR IGNORE INTO revisions (name, value) VALUES (?, ?)",
+                        [("posts", time.time_ns()), ("campaigns", time.time_ns())],
+                    )
+                    await db.commit()
+                    self.db = db
+        return self.db
+
+    @asynccontextmanager
+    async def _transaction(self) -> AsyncIterator[Any]:
+        """Run a write in its own transaction: committed, or rolled back on error"""
+        db = await self._db()
+        async with self.write_lock:
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                await db.rollback()
+                raise
+            await db.commit()
+
+    async def revision(self, table: str) -> int:
+        db = await self._db()
+        async with db.execute("SELECT value FROM revisions WHERE name = ?", (table,)) as cursor:
+            row = await cursor.fetchone()
+        return row[0]
+
+    async def image_in_use(self, key: str) -> bool:
+        db = await self._db()
+        # Deletes are rare, so a scan beats maintaining a reference table
+        async with db.execute(
+            "SELECT 1 FROM posts WHERE instr(data, ?) > 0 LIMIT 1", (f"/api/images/{key}",)
+        ) as cursor:
+            return await cursor.fetchone() is not None
+
+    @staticmethod
+    async def _bump(db, *tables: str) -> None:
+        """Bump revisions inside the write's transaction, so every worker sees them"""
+        placeholders = ", ".join("?" * len(tables))
+        await db.execute(
+            f"UPDATE revisions SET value = value + 1 WHERE name IN ({placeholders})", tables
+        )
+
+    @staticmethod
+    def _post_row(post: Post) -> tuple:
+        return (
+            post.id,
+            post.campaign_id,
+            post.status.value,
+            post.template_type.value,
+            _timestamp(post.scheduled_at),
+            _timestamp(post.created_at),
+            post.model_dump_json(),
+        )
+
+    async def _insert_posts(self, db, posts: List[Post]) -> None:
+        await db.executemany(
+            "INSERT OR REPLACE INTO posts "
+            "(id, campaign_id, status, template_type, scheduled_at, created_at, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [self._post_row(post) for post in posts],
+        )
+
+    async def add_post(self, post: Post) -> None:
+        async with self._transaction() as db:
+            await self._insert_posts(db, [post])
+            await self._bump(db, "posts")
+
+    async def get_post(self, post_id: str) -> Optional[Post]:
+        db = await self._db()
+        async with db.execute("SELECT data FROM posts WHERE id = ?", (post_id,)) as cursor:
+            row = await cursor.fetchone()
+        return Post.model_validate_json(row[0]) if row else None
+
+    async def get_post_json(self, post_id: str) -> Optional[bytes]:
+        db = await self._db()
+        async with db.execute("SELECT data FROM posts WHERE id = ?", (post_id,)) as cursor:
+            row = await cursor.fetchone()
+        return row[0].encode() if row else None
+
+    async def delete_post(self, post_id: str) -> bool:
+        async with self._transaction() as db:
+            cursor = await db.execute("DELETE FROM posts WHERE id = ?", (post_id,))
+            if cursor.rowcount > 0:
+                await self._bump(db, "posts")
+        return cursor.rowcount > 0
+
+    async def list_posts(
+        self,
+        *,
+        status: Optional[PostStatus] = None,
+        template_type: Optional[TemplateType] = None,
+        scheduled_from: Optional[datetime] = None,
+        scheduled_to: Optional[datetime] = None,
+        campaign_id: Optional[str] = None,
+        standalone: bool = False,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+    ) -> List[Post]:
+        rows = await self._select_posts(
+            "data", status, template_type, scheduled_from, scheduled_to,
+            campaign_id, standalone, after, limit,
+        )
+        return [Post.model_validate_json(row[0]) for row in rows]
+
+    async def list_posts_json(
+        self,
+        *,
+        status: Optional[PostStatus] = None,
+        template_type: Optional[TemplateType] = None,
+        scheduled_from: Optional[datetime] = None,
+        scheduled_to: Optional[datetime] = None,
+        campaign_id: Optional[str] = None,
+        standalone: bool = False,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[tuple, bytes]]:
+        # The stored column is the serialized post; only the sort key is rebuilt
+        key = "COALESCE(scheduled_at, 0.0), created_at, id" if campaign_id else "created_at, id"
+        rows = await self._select_posts(
+            f"{key}, data", status, template_type, scheduled_from, scheduled_to,
+            campaign_id, standalone, after, limit,
+        )
+        return [(tuple(row[:-1]), row[-1].encode()) for row in rows]
+
+    async def _select_posts(
+        self,
+        columns: str,
+        status: Optional[PostStatus],
+        template_type: Optional[TemplateType],
+        scheduled_from: Optional[datetime],
+        scheduled_to: Optional[datetime],
+        campaign_id: Optional[str],
+        standalone: bool,
+        after: Optional[tuple],
+        limit: Optional[int],
+    ) -> list:
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status.value)
+        if template_type is not None:
+            clauses.append("template_type = ?")
+            params.append(template_type.value)
+        if scheduled_from is not None:
+            clauses.append("scheduled_at >= ?")
+            params.append(_timestamp(scheduled_from))
+        if scheduled_to is not None:
+            clauses.append("scheduled_at < ?")
+            params.append(_timestamp(scheduled_to))
+        if campaign_id is not None:
+            clauses.append("campaign_id = ?")
+            params.append(campaign_id)
+        if standalone:
+            clauses.append("campaign_id IS NULL")
+
+        # Must match sort_key()
+        order = (
+            "COALESCE(scheduled_at, 0.0), created_at, id" if campaign_id else "created_at, id"
+        )
+        if after is not None:
+            clauses.append(f"({order}) > ({', '.join('?' * len(after))})")
+            params.extend(after)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        limit_clause = ""
+        if limit is not None:
+            limit_clause = "LIMIT ?"
+            params.append(limit)
+        db = await self._db()
+        async with db.execute(
+            f"SELECT {columns} FROM posts {where} ORDER BY {order} {limit_clause}", params
+        ) as cursor:
+            return await cursor.fetchall()
+
+    async def transition_post(
+        self,
+        post_id: str,
+        expected: PostStatus,
+        status: PostStatus,
+        error: Optional[str] = None,
+        published_at: Optional[datetime] = None,
+        claimed_at: Optional[datetime] = None,
+        content: Optional[Post] = None,
+    ) -> Optional[Post]:
+        # A single conditional UPDATE is atomic across every process on the file
+        async with self._transaction() as db:
+            cursor = await db.execute(
+                "UPDATE posts SET status = ?, data = json_set(COALESCE(?, data), "
+                "'$.status', ?, '$.error', ?, '$.published_at', ?, '$.claimed_at', ?) "
+                "WHERE id = ? AND status = ?",
+                (
+                    status.value,
+                    content.model_dump_json() if content else None,
+                    status.value,
+                    error,
+                    published_at.isoformat() if published_at else None,
+                    claimed_at.isoformat() if claimed_at else None,
+                    post_id,
+                    expected.value,
+                ),
+            )
+            if cursor.rowcount > 0:
+                await self._bump(db, "posts")
+        if cursor.rowcount == 0:
+            return None
+        return await self.get_post(post_id)
+
+    async def _load_campaign(self, data: str) -> Campaign:
+        campaign = Campaign.model_validate_json(data)
+        campaign.posts = await self.list_posts(campaign_id=campaign.id)
+        return campaign
+
+    async def add_campaign(self, campaign: Campaign) -> None:
+        for post in campaign.posts:
+            post.campaign_id = campaign.id
+        async with self._transaction() as db:
+            await self._insert_posts(db, campaign.posts)
+            await self._upsert_campaign(db, campaign)
+            await self._bump(db, "posts", "campaigns")
+
+    async def _upsert_campaign(self, db, campaign: Campaign) -> None:
+        await db.execute(
+            "INSERT OR REPLACE INTO campaigns "
+            "(id, status, template_type, created_at, data) VALUES (?, ?, ?, ?, ?)",
+            (
+                campaign.id,
+                campaign.status,
+                campaign.template_type.value,
+                _timestamp(campaign.created_at),
+                campaign.model_dump_json(exclude={"posts"}),
+            ),
+        )
+
+    async def get_campaign(
+        self, campaign_id: str, with_posts: bool = True
+    ) -> Optional[Campaign]:
+        db = await self._db()
+        async with db.execute(
+            "SELECT data FROM campaigns WHERE id = ?", (campaign_id,)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if not row:
+            return None
+        if with_posts:
+            return await self._load_campaign(row[0])
+        return Campaign.model_validate_json(row[0])
+
+    async def update_campaign(self, campaign: Campaign) -> None:
+        async with self._transaction() as db:
+            await self._upsert_campaign(db, campaign)
+            await self._bump(db, "campaigns")
+
+    async def delete_campaign(self, campaign_id: str) -> bool:
+        async with self._transaction() as db:
+            cursor = await db.execute("DELETE FROM campaigns WHERE id = ?", (campaign_id,))
+            await db.execute("DELETE FROM posts WHERE campaign_id = ?", (campaign_id,))
+            await self._bump(db, "posts", "campaigns")
+        return cursor.rowcount > 0
+
+    async def list_campaigns(
+        self,
+        *,
+        status: Optional[str] = None,
+        template_type: Optional[TemplateType] = None,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+        with_posts: bool = True,
+    ) -> List[Campaign]:
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(status)
+        if template_type is not None:
+            clauses.append("template_type = ?")
+            params.append(template_type.value)
+        if after is not None:
+            clauses.append("(created_at, id) > (?, ?)")
+            params.extend(after[:2])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        limit_clause = ""
+        if limit is not None:
+            limit_clause = "LIMIT ?"
+            params.append(limit)
+        db = await self._db()
+        async with db.execute(
+            f"SELECT data FROM campaigns {where} ORDER BY created_at, id {limit_clause}",
+            params,
+        ) as cursor:
+            rows = await cursor.fetchall()
+        if with_posts:
+            return [await self._load_campaign(row[0]) for row in rows]
+        return [Campaign.model_validate_json(row[0]) for row in rows]
+
+
+def get_repository(name: str) -> Repository:
+    """Create the repository configured by ``settings.repository``"""
+    if name == "memory":
+        return InMemoryRepository()
+    if name == "sqlite":
+        return SQLiteRepository(settings.sqlite_path)
+    raise ValueError(f"Unknown repository: {name}")
+
+
+repository = get_repository(settings.repository)
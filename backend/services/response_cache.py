@@ -0,0 +1,193 @@
+import asyncio
+import copy
+import hashlib
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from backend.config import settings
+
+
+def cache_key(model_id: str, prompt: str) -> str:
+    """Content-addressed key for a fully built prompt sent to a model"""
+    return hashlib.sha256(f"{model_id}\n{prompt}".encode()).hexdigest()
+
+
+class CacheBackend(ABC):
+    """Key/value storage for cached model responses with TTL and LRU eviction"""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached value, or None if missing or expired"""
+
+    @abstractmethod
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a value, evicting least recently used entries if full"""
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Drop every entry"""
+
+    async def close(self) -> None:
+        """Release connections"""
+
+
+class MemoryCache(CacheBackend):
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (expires_at, value), least recently used first
+        self.entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        # Callers may modify what they get back
+        return copy.deepcopy(value)
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        self.entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(value))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def clear(self) -> None:
+        self.entries.clear()
+
+
+class SQLiteCache(CacheBackend):
+    """On-disk cache shared by every worker on a host"""
+
+    def __init__(self, path: str, ttl: float, max_entries: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.db = None
+        self.lock = asyncio.Lock()
+
+    async def _db(self):
+        if self.db is None:
+            async with self.lock:
+                if self.db is None:
+                    import aiosqlite
+
+                    db = await aiosqlite.connect(self.path)
+                    await db.execute("PRAGMA journal_mode=WAL")
+                    await db.execute("PRAGMA busy_timeout=5000")
+                    await db.execute(
+                        "CREATE TABLE IF NOT EXISTS responses ("
+                        "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                        "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                    )
+                    await db.execute(
+                        "CREATE INDEX IF NOT EXISTS responses_accessed_at "
+                        "ON responses (accessed_at)"
+                    )
+                    await db.commit()
+                    self.db = db
+        return self.db
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        db = await self._db()
+        now = time.time()
+        async with db.execute(
+            "SELECT value FROM responses WHERE key = ? AND expires_at >= ?", (key, now)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        await db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        await db.commit()
+        return json.loads(row[0])
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        db = await self._db()
+        now = time.time()
+        await db.execute(
+            "INSERT OR REPLACE INTO responses (key, value, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now + self.ttl, now),
+        )
+        await db.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+        await db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        await db.commit()
+
+    async def clear(self) -> None:
+        db = await self._db()
+        await db.execute("DELETE FROM responses")
+        await db.commit()
+
+    async def close(self) -> None:
+        if self.db is not None:
+            await self.db.close()
+            self.db = None
+
+
+class ResponseCache:
+    """Cache in front of a model call, with hit/miss counters"""
+
+    def __init__(self, backend: Optional[CacheBackend]):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.backend is None:
+            return None
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        if self.backend is not None:
+            await self.backend.set(key, value)
+
+    async def close(self) -> None:
+        if self.backend is not None:
+            await self.backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def get_cache_backend(name: Optional[str]) -> Optional[CacheBackend]:
+    """Create the backend configured by ``settings.caption_cache`` (None = off)"""
+    if not name:
+        return None
+    if name == "memory":
+        return MemoryCache(settings.caption_cache_ttl, settings.caption_cache_max_entries)
+    if name == "sqlite":
+        return SQLiteCache(
+            settings.caption_cache_path,
+            settings.caption_cache_ttl,
+            settings.caption_cache_max_entries,
+        )
+    raise ValueError(f"Unknown caption cache: {name}")
+
+
+caption_cache = ResponseCache(get_cache_backend(settings.caption_cache))
@@ -0,0 +1,286 @@
+import asyncio
+import heapq
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from backend.config import settings
+from backend.models import Post, PostStatus
+from backend.services.campaign_service import campaign_service
+from backend.services.publisher import Publisher, publisher
+from backend.services.repository import repository
+from backend.services.tracing import logger
+from backend.services.upstream import UpstreamUnavailableError
+
+
+class Scheduler:
+    """
+    Publishes SCHEDULED posts when their ``scheduled_at`` arrives
+
+    Due times sit in a min-heap, so each tick only pops what is due
+    (O(log n) per post) and sleeps until the next due time. The heap only
+    holds posts due within ``scheduler_lookahead`` seconds; it is refilled
+    from the repository's scheduled_at index every ``scheduler_sync_interval``
+    seconds, which also recovers the queue after a restart and picks up posts
+    created by other workers.
+
+    Dispatching claims a post by moving it SCHEDULED -> PUBLISHING with the
+    repository's compare-and-set, so every worker can run a scheduler and
+    only one of them hands each post to the publisher. Posts of paused
+    campaigns are left scheduled until the campaign is resumed; posts of
+    completed campaigns go back to drafts.
+
+    PENDING slots of lazy campaigns are queued ``campaign_generation_lead``
+    seconds before their slot and claimed PENDING -> GENERATING the same way,
+    so their content is generated once, shortly before it is needed.
+
+    Claims record ``claimed_at``. A sync hands posts left GENERATING longer
+    than ``scheduler_generate_lease`` back to PENDING, and posts left
+    PUBLISHING longer than ``scheduler_publish_lease`` back to SCHEDULED, so
+    work of a crashed or cancelled worker is retried.
+    """
+
+    def __init__(self, publisher: Publisher):
+        self.publisher = publisher
+        # (due timestamp, post id); entries whose time no longer matches are stale
+        self.heap: List[Tuple[float, str]] = []
+        self.due: Dict[str, float] = {}
+        self.wakeup: Optional[asyncio.Event] = None
+        self.next_sync = 0.0
+        self.task: Optional[asyncio.Task] = None
+        self.dispatching: Set[asyncio.Task] = set()
+        self.semaphore = asyncio.Semaphore(settings.scheduler_concurrency)
+        self.generated = 0
+        self.published = 0
+        self.failed = 0
+
+    def schedule(self, posts: Iterable[Post]) -> None:
+        """Queue scheduled or pending posts created or rescheduled by this worker"""
+        horizon = time.time() + settings.scheduler_lookahead
+        for post in posts:
+            if not post.scheduled_at:
+                continue
+            if post.status == PostStatus.SCHEDULED:
+                due = post.scheduled_at.timestamp()
+            elif post.status == PostStatus.PENDING:
+                due = post.scheduled_at.timestamp() - settings.campaign_generation_lead
+            else:
+                continue
+            # Later posts are picked up by a future sync
+            if due > horizon or self.due.get(post.id) == due:
+                continue
+            self.due[post.id] = due
+            heapq.heappush(self.heap, (due, post.id))
+            if self.wakeup and self.heap[0][1] == post.id:
+                self.wakeup.set()
+
+    def refresh(self) -> None:
+        """Reload due posts on the next tick (e.g. after a campaign is resumed)"""
+        self.next_sync = 0.0
+        if self.wakeup:
+            self.wakeup.set()
+
+    async def reclaim(self) -> None:
+        """Release claims whose worker has held them longer than the lease"""
+        leases = [
+            (PostStatus.GENERATING, PostStatus.PENDING, settings.scheduler_generate_lease),
+            (PostStatus.PUBLISHING, PostStatus.SCHEDULED, settings.scheduler_publish_lease),
+        ]
+        for claimed, released, lease in leases:
+            expired = datetime.now() - timedelta(seconds=lease)
+            for post in await repository.list_posts(status=claimed):
+                if post.claimed_at is None or post.claimed_at < expired:
+                    await repository.transition_post(post.id, claimed, released)
+
+    async def sync(self) -> None:
+        """Load posts due within the lookahead window from the repository"""
+        await self.reclaim()
+        horizon = time.time() + settings.scheduler_lookahead
+        posts = await repository.list_posts(
+            status=PostStatus.SCHEDULED, scheduled_to=datetime.fromtimestamp(horizon)
+        )
+        pending = await repository.list_posts(
+            status=PostStatus.PENDING,
+            scheduled_to=datetime.fromtimestamp(horizon + settings.campaign_generation_lead),
+        )
+
+        campaign_status: Dict[str, Optional[str]] = {}
+        due = []
+        for post in posts + pending:
+            if post.campaign_id:
+                if post.campaign_id not in campaign_status:
+                    campaign = await repository.get_campaign(post.campaign_id, with_posts=False)
+                    campaign_status[post.campaign_id] = campaign.status if campaign else None
+                status = campaign_status[post.campaign_id]
+                # Slots of completed campaigns are never filled
+                if status == "paused" or (post.status == PostStatus.PENDING and status != "active"):
+                    continue
+            due.append(post)
+        self.schedule(due)
+
+    async def generate(
+        self, post_id: str, expected: PostStatus = PostStatus.PENDING
+    ) -> Optional[Post]:
+        """
+        Generate the content of a lazy campaign slot now
+
+        Args:
+            post_id: The slot to fill
+            expected: Status the post must be in to be claimed (PENDING, or
+                FAILED to regenerate)
+
+        Returns:
+            The filled post, or None if it was not in ``expected`` (for
+            example because another worker is already generating it) or was
+            deleted or released while generating
+        """
+        post = await repository.transition_post(
+            post_id, expected, PostStatus.GENERATING, claimed_at=datetime.now()
+        )
+        if post is None:
+            return None
+
+        try:
+            post = await campaign_service.fill_post(post)
+        except UpstreamUnavailableError:
+            # Quota or outage: leave the slot for a later sync to retry
+            await repository.transition_post(post_id, PostStatus.GENERATING, PostStatus.PENDING)
+            raise
+        except Exception as e:
+            post.status = PostStatus.FAILED
+            post.error = f"Caption generation failed: {str(e)}"
+
+        # Only saved while still claimed, so a deleted campaign's post stays deleted
+        post = await repository.transition_post(
+            post_id, PostStatus.GENERATING, post.status, error=post.error, content=post
+        )
+        if post is None:
+            return None
+        self.generated += 1
+        self.schedule([post])
+        return post
+
+    async def dispatch(self, post_id: str) -> None:
+        """Fill or publish one due post, unless another worker got to it first"""
+        post = await repository.get_post(post_id)
+        if not post or not post.scheduled_at:
+            return
+        if post.status not in (PostStatus.SCHEDULED, PostStatus.PENDING):
+            return
+        lead = settings.campaign_generation_lead if post.status == PostStatus.PENDING else 0
+        if post.scheduled_at.timestamp() - lead > time.time():
+            # Rescheduled since it was queued
+            self.schedule([post])
+            return
+
+        if post.campaign_id:
+            campaign = await repository.get_campaign(post.campaign_id, with_posts=False)
+            if campaign and campaign.status == "paused":
+                return
+            if post.status == PostStatus.PENDING:
+                if campaign and campaign.status == "active":
+                    await self.generate(post_id)
+                return
+            if campaign and campaign.status == "completed":
+                await repository.transition_post(post_id, PostStatus.SCHEDULED, PostStatus.DRAFT)
+                return
+
+        # Claim the post; only one scheduler across workers wins
+        post = await repository.transition_post(
+            post_id, PostStatus.SCHEDULED, PostStatus.PUBLISHING, claimed_at=datetime.now()
+        )
+        if post is None:
+            return
+
+        try:
+            await self.publisher.publish(post)
+        except Exception as e:
+            self.failed += 1
+            logger.warning(
+                "Publishing post failed: %s",
+                e,
+                extra={"post_id": post_id, "campaign_id": post.campaign_id},
+            )
+            await repository.transition_post(
+                post_id, PostStatus.PUBLISHING, PostStatus.FAILED, error=str(e)
+            )
+            return
+
+        self.published += 1
+        await repository.transition_post(
+            post_id, PostStatus.PUBLISHING, PostStatus.PUBLISHED, published_at=datetime.now()
+        )
+
+    async def _dispatch(self, post_id: str) -> None:
+        async with self.semaphore:
+            try:
+                await self.dispatch(post_id)
+            except Exception:
+                logger.exception("Dispatching post failed", extra={"post_id": post_id})
+
+    async def _run(self) -> None:
+        while True:
+            now = time.time()
+            if now >= self.next_sync:
+                self.next_sync = now + settings.scheduler_sync_interval
+                try:
+                    await self.sync()
+                except Exception:
+                    logger.exception("Scheduler sync failed")
+
+            now = time.time()
+            while self.heap and self.heap[0][0] <= now:
+                due, post_id = heapq.heappop(self.heap)
+                if self.due.get(post_id) != due:
+                    continue
+                del self.due[post_id]
+                task = asyncio.create_task(self._dispatch(post_id))
+                self.dispatching.add(task)
+                task.add_done_callback(self.dispatching.discard)
+
+            wake_at = min(self.next_sync, self.heap[0][0]) if self.heap else self.next_sync
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), max(wake_at - time.time(), 0))
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """
+        Start the scheduler loop on the running event loop
+
+        Raises:
+            RuntimeError: The publisher is a stub, so due posts would be
+                marked published without being sent anywhere
+        """
+        if not self.publisher.delivers:
+            raise RuntimeError(
+                "The scheduler needs a real publisher (PUBLISHER=webhook); "
+                "the local stub would mark posts published without sending them"
+            )
+        if self.task is None:
+            self.wakeup = asyncio.Event()
+            self.next_sync = 0.0
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the loop and wait for in-flight dispatches"""
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        await asyncio.gather(*self.dispatching, return_exceptions=True)
+        await self.publisher.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.task is not None,
+            "queued": len(self.due),
+            "dispatching": len(self.dispatching),
+            "generated": self.generated,
+            "published": self.published,
+            "failed": self.failed,
+        }
+
+
+scheduler = Scheduler(publisher)
@@ -0,0 +1,38 @@
+import json
+from typing import Any, AsyncIterator, Literal, Tuple
+
+from fastapi.responses import StreamingResponse
+
+StreamFormat = Literal["sse", "ndjson"]
+
+# (event name, JSON-compatible payload)
+StreamEvent = Tuple[str, Any]
+
+MEDIA_TYPES = {
+    "sse": "text/event-stream",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def format_event(event: str, data: Any, fmt: StreamFormat) -> str:
+    """Encode one event as a Server-Sent Event or an NDJSON line"""
+    if fmt == "ndjson":
+        return json.dumps({"event": event, "data": data}) + "\n"
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def event_stream(
+    events: AsyncIterator[StreamEvent], fmt: StreamFormat = "sse"
+) -> StreamingResponse:
+    """Stream events to the client as they are produced"""
+
+    async def body():
+        async for event, data in events:
+            yield format_event(event, data, fmt)
+
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[fmt],
+        # Stop reverse proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,194 @@
+import json
+import logging
+import sys
+from typing import Any
+
+from opentelemetry import propagate, trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+from backend.config import settings
+
+tracer = trace.get_tracer("orchestrator")
+logger = logging.getLogger("orchestrator")
+
+_configured = False
+
+
+def get_span_exporter(name: str):
+    """Create the span exporter configured by ``settings.tracing_exporter``"""
+    try:
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+    except ImportError as e:
+        raise RuntimeError(
+            "Tracing requires the OpenTelemetry SDK: pip install opentelemetry-sdk"
+        ) from e
+
+    if name == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError as e:
+            raise RuntimeError(
+                "The otlp exporter requires: pip install opentelemetry-exporter-otlp-proto-http"
+            ) from e
+        # Falls back to OTEL_EXPORTER_OTLP_* variables, then localhost:4318
+        return OTLPSpanExporter(endpoint=settings.tracing_endpoint)
+    if name == "file":
+        # One JSON span per line
+        return ConsoleSpanExporter(
+            out=open(settings.tracing_file, "a", encoding="utf-8"),
+            formatter=lambda span: span.to_json(indent=None) + "\n",
+        )
+    if name == "console":
+        return ConsoleSpanExporter()
+    raise ValueError(f"Unknown tracing exporter: {name}")
+
+
+def setup_tracing() -> None:
+    """
+    Install the tracer provider and log handler once per process
+
+    Without ``TRACING_EXPORTER`` spans stay no-ops from opentelemetry-api and
+    cost next to nothing; only logging is configured.
+    """
+    global _configured
+    if _configured:
+        return
+    _configured = True
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.addFilter(TraceContextFilter())
+    handler.setFormatter(
+        JsonFormatter()
+        if settings.log_format == "json"
+        else logging.Formatter(
+            "%(asctime)s %(levelname)s %(name)s [trace=%(trace_id)s span=%(span_id)s] %(message)s"
+        )
+    )
+    logger.addHandler(handler)
+    logger.setLevel(settings.log_level)
+    logger.propagate = False
+
+    if not settings.tracing_exporter:
+        return
+
+    exporter = get_span_exporter(settings.tracing_exporter)
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.tracing_service_name}),
+        sampler=ParentBased(TraceIdRatioBased(settings.tracing_sample_ratio)),
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+
+def shutdown_tracing() -> None:
+    """Flush spans that are still buffered"""
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):
+        provider.shutdown()
+
+
+class TraceContextFilter(logging.Filter):
+    """
+    Tags records with the current trace and span id, and samples them
+
+    Records below WARNING inside a trace that was not sampled are dropped,
+    so debug and info logging follows the trace sample ratio; warnings and
+    errors are always kept.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = trace.get_current_span().get_span_context()
+        if context.is_valid:
+            if not context.trace_flags.sampled and record.levelno < logging.WARNING:
+                return False
+            record.trace_id = format(context.trace_id, "032x")
+            record.span_id = format(context.span_id, "016x")
+        else:
+            record.trace_id = record.span_id = "-"
+        return True
+
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including ``extra`` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            (key, value) for key, value in vars(record).items() if key not in _RECORD_FIELDS
+        )
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def record_usage(span, response: Any) -> None:
+    """Copy token counts from a Gemini response onto a span"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for attribute, field in (
+        ("gen_ai.usage.input_tokens", "prompt_token_count"),
+        ("gen_ai.usage.output_tokens", "candidates_token_count"),
+        ("gen_ai.usage.cached_tokens", "cached_content_token_count"),
+    ):
+        value = getattr(usage, field, None)
+        if isinstance(value, int):
+            span.set_attribute(attribute, value)
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening a server span for every request
+
+    Continues a trace from an incoming ``traceparent`` header and names the
+    span after the matched route template once routing is done.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {
+            key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]
+        }
+        method = scope["method"]
+        with tracer.start_as_current_span(
+            f"{method} {scope['path']}",
+            context=propagate.extract(headers),
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope["path"]},
+        ) as span:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    span.set_attribute("http.response.status_code", status)
+                    if status >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    span.update_name(f"{method} {route}")
+                    span.set_attribute("http.route", route)
@@ -0,0 +1,282 @@
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from opentelemetry import trace
+
+from backend.config import settings
+from backend.services.metrics import UPSTREAM_IN_FLIGHT, UPSTREAM_SECONDS
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: timeouts, quota (429) and transient server errors
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class UpstreamUnavailableError(Exception):
+    """Raised when an upstream model is unavailable (circuit open or retries exhausted)"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    """HTTP status of an upstream error, if it has one"""
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    try:
+        import httpx
+
+        if isinstance(error, httpx.TransportError):
+            return True
+    except ImportError:
+        pass
+    return error_status(error) in RETRYABLE_STATUS
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds to wait according to the error's Retry-After header, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    value = headers.get("retry-after") if headers else None
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """
+    Adaptive token bucket for a per-minute quota
+
+    Holds up to ten seconds' worth of tokens. On a quota error the rate is
+    halved (down to 10% of the configured rate) and then restored step by
+    step on success, so sustained throughput settles just under the real
+    quota instead of oscillating into errors.
+    """
+
+    def __init__(self, per_minute: float):
+        self.max_rate = per_minute / 60.0
+        self.rate = self.max_rate
+        self.capacity = max(self.max_rate * 10, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        # Requests larger than the bucket would never fit; cap them
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def penalize(self, pause: Optional[float] = None) -> None:
+        """Back off after a quota error, optionally pausing for Retry-After"""
+        self.rate = max(self.rate / 2, self.max_rate / 10)
+        if pause:
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+
+    def reward(self) -> None:
+        """Recover 5% of the configured rate after a successful call"""
+        self.rate = min(self.rate + self.max_rate / 20, self.max_rate)
+
+
+class CircuitBreaker:
+    """Fails fast after repeated upstream failures, then probes with one call"""
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def check(self) -> bool:
+        """
+        Raise if calls are currently not allowed
+
+        Returns:
+            Whether this call is the half-open probe; the caller must record
+            an outcome or ``release_probe()`` when it ends
+        """
+        state = self.state
+        if state == "closed":
+            return False
+        if state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        remaining = max(self.reset_timeout - (time.monotonic() - self.opened_at), 1.0)
+        raise UpstreamUnavailableError(
+            f"{self.name} circuit open after repeated failures", retry_after=remaining
+        )
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+    def release_probe(self) -> None:
+        """End a probe that told nothing about upstream health (cancelled, throttled)"""
+        self.probing = False
+
+
+class UpstreamClient:
+    """
+    Shared call path for one upstream model
+
+    Bounds concurrency, waits for request/token quota, retries retryable
+    errors with jittered exponential backoff (honouring Retry-After) and
+    trips a circuit breaker when the upstream keeps failing.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+    ):
+        self.name = name
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.breaker = CircuitBreaker(
+            name,
+            settings.upstream_breaker_threshold, settings.upstream_breaker_reset
+        )
+        self.max_attempts = settings.upstream_max_retries + 1
+        self.retries = 0
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(max_delay, base * 2^attempt)]
+        ceiling = min(
+            settings.upstream_retry_max_delay,
+            settings.upstream_retry_base_delay * (2**attempt),
+        )
+        return random.uniform(0, ceiling)
+
+    async def call(
+        self, func: Callable[[], Awaitable[T]], tokens: int = 0, model: Optional[str] = None
+    ) -> T:
+        """
+        Run an upstream call under the limiter, retry policy and breaker
+
+        Args:
+            func: Creates the upstream awaitable; called again on each retry
+            tokens: Estimated tokens the call will consume
+            model: Model id used to label latency metrics (defaults to the upstream name)
+        """
+        in_flight = UPSTREAM_IN_FLIGHT.labels(self.name)
+        for attempt in range(self.max_attempts):
+            probe = self.breaker.check()
+            started = time.perf_counter()
+            try:
+                if self.requests:
+                    await self.requests.acquire()
+                if self.tokens and tokens:
+                    await self.tokens.acquire(tokens)
+
+                async with self.semaphore:
+                    started = time.perf_counter()
+                    with in_flight.track_inprogress():
+                        result = await func()
+            except Exception as e:
+                status = error_status(e)
+                retryable = is_retryable(e)
+                if status == 429:
+                    outcome = "rate_limited"
+                else:
+                    outcome = "retryable" if retryable else "error"
+                UPSTREAM_SECONDS.labels(model or self.name, outcome).observe(
+                    time.perf_counter() - started
+                )
+                if not retryable:
+                    if status is not None:
+                        # The upstream answered (e.g. a 400), so it is healthy
+                        self.breaker.record_success()
+                    raise
+
+                error, wait = e, retry_after(e)
+                if status == 429:
+                    # Quota errors are paced by the limiter, not the breaker:
+                    # opening the circuit would turn a slowdown into 503s
+                    for bucket in (self.requests, self.tokens):
+                        if bucket:
+                            bucket.penalize(wait)
+                else:
+                    self.breaker.record_failure()
+
+                if attempt == self.max_attempts - 1:
+                    raise UpstreamUnavailableError(
+                        f"{self.name} unavailable after {self.max_attempts} attempts: {e}",
+                        retry_after=wait,
+                    ) from e
+            else:
+                UPSTREAM_SECONDS.labels(model or self.name, "success").observe(
+                    time.perf_counter() - started
+                )
+                self.breaker.record_success()
+                for bucket in (self.requests, self.tokens):
+                    if bucket:
+                        bucket.reward()
+                return result
+            finally:
+                # Cancelled, throttled or failed locally: let another call probe
+                if probe and self.breaker.probing:
+                    self.breaker.release_probe()
+
+            self.retries += 1
+            trace.get_current_span().add_event(
+                "upstream.retry",
+                {"upstream": self.name, "attempt": attempt + 1, "error": str(error)[:200]},
+            )
+            await asyncio.sleep(wait if wait is not None else self._backoff(attempt))
+
+        raise AssertionError("unreachable")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.state,
+            "retries": self.retries,
+            "requests_per_minute": round(self.requests.rate * 60) if self.requests else None,
+            "tokens_per_minute": round(self.tokens.rate * 60) if self.tokens else None,
+        }
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for quota accounting (about four characters per token)"""
+    return len(text) // 4 + 1
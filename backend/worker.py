@@ -0,0 +1,35 @@
+"""
+Standalone generation worker
+
+Runs job workers without the HTTP API so generation can scale separately
+from the API tier. Needs the shared SQLite job backend on the same database
+file as the API processes (which can then run with JOB_WORKERS=0); the
+in-memory backend only serves its own process and is refused.
+
+Usage:
+    JOB_BACKEND=sqlite REPOSITORY=sqlite python -m backend.worker
+"""
+import asyncio
+
+# Importing the routers registers the job handlers
+from backend.routers import campaigns, posts  # noqa: F401
+from backend.config import settings
+from backend.services.job_queue import job_queue
+from backend.services.repository import repository
+from backend.services.scheduler import scheduler
+from backend.services.tracing import setup_tracing
+
+
+async def main():
+    if not job_queue.backend.shared:
+        raise SystemExit("backend.worker needs a shared job backend: set JOB_BACKEND=sqlite")
+    setup_tracing()
+    await repository.connect()
+    job_queue.start(settings.job_workers or 1)
+    if settings.scheduler_enabled:
+        scheduler.start()
+    await asyncio.gather(*job_queue.workers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+Cold start benchmark: import time and time to first byte for /health.
+
+Each run uses a fresh interpreter, as a scale-from-zero instance would:
+the import run times ``import backend.main`` and reports whether heavy
+modules (google.genai, PIL) were loaded on the way; the server run starts
+uvicorn and measures from process spawn until the first byte of a /health
+response arrives.
+
+Usage:
+    python -m benchmarks.cold_start [--runs 5] [--port 8765]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ["google.genai", "PIL"]
+
+IMPORT_SCRIPT = f"""
+import json, sys, time
+started = time.perf_counter()
+import backend.main
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("GEMINI_API_KEY", "benchmark")
+    env["PYTHONPATH"] = os.getcwd() + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def _import_run() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _first_byte(port: int) -> bool:
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=1) as conn:
+            conn.sendall(b"GET /health HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            return bool(conn.recv(1))
+    except OSError:
+        return False
+
+
+def _server_run(port: int, timeout: float = 30.0) -> float:
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "backend.main:app",
+            "--port", str(port), "--log-level", "warning",
+        ],
+        env=_env(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if _first_byte(port):
+                return time.perf_counter() - started
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited before serving /health")
+            time.sleep(0.005)
+        raise RuntimeError("Timed out waiting for /health")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(runs: int, port: int) -> None:
+    imports = [_import_run() for _ in range(runs)]
+    ttfb = [_server_run(port) for _ in range(runs)]
+
+    import_times = [run["seconds"] for run in imports]
+    print(f"{runs} runs, fresh interpreter each")
+    print(f"{'metric':<28} {'median ms':>10} {'max ms':>10}")
+    print(
+        f"{'import backend.main':<28} {statistics.median(import_times) * 1000:>10.0f} "
+        f"{max(import_times) * 1000:>10.0f}"
+    )
+    print(
+        f"{'spawn -> /health first byte':<28} {statistics.median(ttfb) * 1000:>10.0f} "
+        f"{max(ttfb) * 1000:>10.0f}"
+    )
+    loaded = sorted({module for run in imports for module in run["loaded"]})
+    print(f"heavy modules loaded at import: {', '.join(loaded) or 'none'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    main(args.runs, args.port)
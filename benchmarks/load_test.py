@@ -0,0 +1,250 @@
+"""
+End-to-end load test of the HTTP API against the fake model backend.
+
+Starts uvicorn with MODEL_BACKEND=fake (no credentials, no network) and
+drives POST /api/posts/, POST /api/posts/batch, POST /api/campaigns/ and the
+list endpoints at each concurrency level for a fixed duration. Reports
+latency percentiles, throughput, errors and the server's peak RSS, so
+hot-path regressions show up in an offline run. Campaigns are timed until
+their job completes.
+
+Fake upstream behaviour is configured through the FAKE_* settings, e.g.
+FAKE_TEXT_LATENCY=0.5 FAKE_IMAGE_LATENCY=4 FAKE_ERROR_RATE=0.02.
+
+Usage:
+    python -m benchmarks.load_test [--concurrency 1 8 32] [--duration 10]
+        [--scenarios posts batch campaigns list_posts poll_posts list_campaigns]
+        [--port 8766]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+DEFAULTS = {
+    "GEMINI_API_KEY": "benchmark",
+    "MODEL_BACKEND": "fake",
+    "CONTEXT_CACHE": "fake",
+    "FAKE_TEXT_LATENCY": "0.2",
+    "FAKE_IMAGE_LATENCY": "1.0",
+    "FAKE_IMAGE_SIZE": "512",
+    "BLOB_STORE_DIR": os.path.join("/tmp", "orchestrator-load-test-media"),
+    "SCHEDULER_ENABLED": "false",
+    # Measure the service, not quota pacing
+    "GEMINI_REQUESTS_PER_MINUTE": "0",
+    "GEMINI_TOKENS_PER_MINUTE": "0",
+    "IMAGEN_REQUESTS_PER_MINUTE": "0",
+}
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    for key, value in DEFAULTS.items():
+        env.setdefault(key, value)
+    env["PYTHONPATH"] = os.getcwd() + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def peak_rss_mb(pid: int) -> Optional[float]:
+    """High-water RSS of a process (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def percentile(values: List[float], q: float) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(q) - 1]
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def next(self) -> int:
+        self.value += 1
+        return self.value
+
+
+async def create_post(client: httpx.AsyncClient, counter: Counter) -> bool:
+    # Distinct prompts, so caches and coalescing don't short-circuit the work
+    response = await client.post(
+        "/api/posts/",
+        json={"template_type": "aesthetic", "custom_prompt": f"load test {counter.next()}"},
+    )
+    return response.status_code == 200
+
+
+async def create_campaign(client: httpx.AsyncClient, counter: Counter) -> bool:
+    response = await client.post(
+        "/api/campaigns/",
+        json={
+            "name": f"load test {counter.next()}",
+            "template_type": "aesthetic",
+            "frequency": "daily",
+            "posts_count": 5,
+            "start_date": "2030-01-01T00:00:00",
+        },
+    )
+    if response.status_code != 202:
+        return False
+    job_id = response.json()["id"]
+    while True:
+        await asyncio.sleep(0.05)
+        job = (await client.get(f"/api/jobs/{job_id}")).json()
+        if job["status"] in ("completed", "failed"):
+            return job["status"] == "completed"
+
+
+async def create_post_batch(client: httpx.AsyncClient, counter: Counter) -> bool:
+    # Two groups sharing caption calls, plus an item generated on its own
+    batch = counter.next()
+    posts = [{"template_type": "aesthetic", "custom_prompt": f"batch {batch}"}] * 6
+    posts += [{"template_type": "book_blog", "custom_prompt": f"batch {batch}"}] * 3
+    posts += [{"template_type": "luxury_life", "variation": f"batch {batch}"}]
+    response = await client.post("/api/posts/batch", json={"posts": posts})
+    return response.status_code == 200 and response.json()["failed"] == 0
+
+
+async def list_posts(client: httpx.AsyncClient, counter: Counter) -> bool:
+    return (await client.get("/api/posts/", params={"limit": 100})).status_code == 200
+
+
+# Last ETag seen per polled path
+etags: Dict[str, str] = {}
+
+
+async def poll_posts(client: httpx.AsyncClient, counter: Counter) -> bool:
+    # A dashboard revalidating its last response: 304 while nothing changed
+    headers = {"If-None-Match": etags["posts"]} if "posts" in etags else {}
+    response = await client.get("/api/posts/", params={"limit": 100}, headers=headers)
+    if response.status_code == 200:
+        etags["posts"] = response.headers["etag"]
+    return response.status_code in (200, 304)
+
+
+async def list_campaigns(client: httpx.AsyncClient, counter: Counter) -> bool:
+    response = await client.get("/api/campaigns/", params={"include_posts": "false"})
+    return response.status_code == 200
+
+
+SCENARIOS: Dict[str, Callable[[httpx.AsyncClient, Counter], Awaitable[bool]]] = {
+    "posts": create_post,
+    "batch": create_post_batch,
+    "campaigns": create_campaign,
+    "list_posts": list_posts,
+    "poll_posts": poll_posts,
+    "list_campaigns": list_campaigns,
+}
+
+
+async def run_level(
+    base_url: str, scenario: str, concurrency: int, duration: float
+) -> Dict[str, float]:
+    call = SCENARIOS[scenario]
+    counter = Counter()
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+
+        async def user():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    ok = await call(client, counter)
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - started)
+                errors += not ok
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+    }
+
+
+def wait_until_ready(base_url: str, server: subprocess.Popen, timeout: float = 30.0) -> None:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if server.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            if httpx.get(f"{base_url}/health").status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError("Timed out waiting for /health")
+
+
+async def main(scenarios: List[str], levels: List[int], duration: float, port: int) -> None:
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "backend.main:app",
+            "--port", str(port), "--log-level", "warning",
+        ],
+        env=_env(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(base_url, server)
+        env = _env()
+        print(
+            f"fake upstream: text {env['FAKE_TEXT_LATENCY']} s, image "
+            f"{env['FAKE_IMAGE_LATENCY']} s, error rate {env.get('FAKE_ERROR_RATE', '0')}; "
+            f"{duration:.0f} s per level"
+        )
+        print(
+            f"{'scenario':<15} {'conc':>5} {'reqs':>6} {'errors':>6} {'req/s':>8} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'peak RSS MB':>12}"
+        )
+        for scenario in scenarios:
+            for concurrency in levels:
+                result = await run_level(base_url, scenario, concurrency, duration)
+                rss = peak_rss_mb(server.pid)
+                print(
+                    f"{scenario:<15} {concurrency:>5} {result['requests']:>6} "
+                    f"{result['errors']:>6} {result['rps']:>8.1f} "
+                    f"{result['p50'] * 1000:>8.0f} {result['p95'] * 1000:>8.0f} "
+                    f"{result['p99'] * 1000:>8.0f} "
+                    f"{rss if rss is not None else float('nan'):>12.0f}"
+                )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+    asyncio.run(main(args.scenarios, args.concurrency, args.duration, args.port))
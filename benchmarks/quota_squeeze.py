@@ -0,0 +1,92 @@
+"""
+Load test of the upstream limiter against a stub that enforces a quota.
+
+The stub accepts ``--quota`` requests per second and answers everything
+above that with a 429 carrying Retry-After. The client is configured with a
+higher requests/min limit than the real quota (``--configured``), as happens
+when a project's quota is cut, and the run reports how many calls
+succeeded, how many upstream 429s were absorbed by retries and the
+resulting throughput compared with the quota ceiling.
+
+Usage:
+    python -m benchmarks.quota_squeeze [--requests 300] [--quota 20] [--configured 60]
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import deque
+from types import SimpleNamespace
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("UPSTREAM_RETRY_BASE_DELAY", "0.05")
+os.environ.setdefault("UPSTREAM_RETRY_MAX_DELAY", "1")
+os.environ.setdefault("UPSTREAM_MAX_RETRIES", "8")
+os.environ.setdefault("UPSTREAM_BREAKER_THRESHOLD", "1000")
+
+from backend.services.upstream import UpstreamClient, UpstreamUnavailableError  # noqa: E402
+
+
+class _QuotaError(Exception):
+    """Shaped like google.genai.errors.ClientError for a 429"""
+
+    def __init__(self, retry_after: float):
+        super().__init__("429 RESOURCE_EXHAUSTED")
+        self.code = 429
+        self.response = SimpleNamespace(headers={"retry-after": f"{retry_after:.2f}"})
+
+
+class _QuotaUpstream:
+    """Sliding one-second window of accepted calls"""
+
+    def __init__(self, per_second: int, latency: float):
+        self.per_second = per_second
+        self.latency = latency
+        self.accepted: deque = deque()
+        self.rejected = 0
+
+    async def call(self):
+        now = time.monotonic()
+        while self.accepted and now - self.accepted[0] >= 1.0:
+            self.accepted.popleft()
+        if len(self.accepted) >= self.per_second:
+            self.rejected += 1
+            raise _QuotaError(1.0 - (now - self.accepted[0]))
+        self.accepted.append(now)
+        await asyncio.sleep(self.latency)
+        return "ok"
+
+
+async def main(requests: int, quota: int, configured: int, latency: float) -> None:
+    upstream = _QuotaUpstream(quota, latency)
+    client = UpstreamClient("stub", max_concurrency=64, requests_per_minute=configured * 60)
+
+    async def one():
+        try:
+            await client.call(upstream.call)
+            return True
+        except UpstreamUnavailableError:
+            return False
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    succeeded = sum(results)
+    print(f"{requests} requests, quota {quota}/s, limiter configured at {configured}/s")
+    print(f"succeeded:        {succeeded}")
+    print(f"failed:           {requests - succeeded}")
+    print(f"upstream 429s:    {upstream.rejected}")
+    print(f"elapsed s:        {elapsed:.2f}")
+    print(f"throughput req/s: {succeeded / elapsed:.1f} (ceiling {quota})")
+    print(f"adapted rate/s:   {client.requests.rate:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--quota", type=int, default=20)
+    parser.add_argument("--configured", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.quota, args.configured, args.latency))
@@ -0,0 +1,117 @@
+"""
+Load test for the Gemini/Imagen service tier against stubbed clients.
+
+Fires a fixed number of concurrent ``generate_caption`` / ``generate_image``
+calls at increasing concurrency limits and reports throughput, plus the
+worst event-loop stall seen by a probe task running alongside (a stand-in
+for ``/health`` latency while generations are in flight).
+
+Usage:
+    python -m benchmarks.service_concurrency [--requests 64] [--latency 0.2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from io import BytesIO
+from types import SimpleNamespace
+
+import google.genai  # noqa: F401  (loaded up front: the services import it lazily)
+from PIL import Image
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+# Measure concurrency alone, not quota pacing
+os.environ.setdefault("GEMINI_REQUESTS_PER_MINUTE", "0")
+os.environ.setdefault("GEMINI_TOKENS_PER_MINUTE", "0")
+os.environ.setdefault("IMAGEN_REQUESTS_PER_MINUTE", "0")
+
+from backend.models import TemplateType  # noqa: E402
+from backend.services.gemini_service import GeminiService  # noqa: E402
+from backend.services.imagen_service import ImagenService  # noqa: E402
+
+
+class _StubModels:
+    """Mimics ``client.aio.models`` with a fixed upstream latency"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        buffered = BytesIO()
+        Image.new("RGB", (64, 64), "white").save(buffered, format="PNG")
+        self.image_bytes = buffered.getvalue()
+
+    async def generate_content(self, **kwargs):
+        await asyncio.sleep(self.latency)
+        return SimpleNamespace(
+            text=json.dumps(
+                {"caption": "mood ✨", "hashtags": ["mood"], "image_prompt": "sunset"}
+            )
+        )
+
+    async def generate_images(self, **kwargs):
+        await asyncio.sleep(self.latency)
+        image = SimpleNamespace(image_bytes=self.image_bytes)
+        return SimpleNamespace(generated_images=[SimpleNamespace(image=image)])
+
+
+def _stub_client(latency: float) -> SimpleNamespace:
+    return SimpleNamespace(aio=SimpleNamespace(models=_StubModels(latency)))
+
+
+async def _probe(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Return the worst delay between scheduled wakeups of the event loop"""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+async def _run(call, requests: int) -> tuple[float, float]:
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(stop))
+    started = time.perf_counter()
+    # Distinct prompts, so identical-request coalescing doesn't kick in
+    await asyncio.gather(*(call(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return elapsed, await probe
+
+
+async def main(requests: int, latency: float, limits: list[int]) -> None:
+    print(f"{requests} requests, stubbed upstream latency {latency * 1000:.0f} ms")
+    print(f"{'service':<8} {'limit':>5} {'elapsed s':>10} {'req/s':>8} {'loop stall ms':>14}")
+
+    for limit in limits:
+        gemini = GeminiService(max_concurrency=limit)
+        gemini.client = _stub_client(latency)
+        elapsed, stall = await _run(
+            lambda i: gemini.generate_caption(TemplateType.AESTHETIC, f"request {i}"),
+            requests,
+        )
+        print(
+            f"{'gemini':<8} {limit:>5} {elapsed:>10.2f} "
+            f"{requests / elapsed:>8.1f} {stall * 1000:>14.1f}"
+        )
+
+    for limit in limits:
+        imagen = ImagenService(max_concurrency=limit)
+        imagen.client = _stub_client(latency)
+        imagen.enabled = True
+        elapsed, stall = await _run(
+            lambda i: imagen.generate_image(f"sunset {i}"), requests
+        )
+        print(
+            f"{'imagen':<8} {limit:>5} {elapsed:>10.2f} "
+            f"{requests / elapsed:>8.1f} {stall * 1000:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--limits", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.latency, args.limits))
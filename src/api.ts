@@ -1,6 +1,12 @@
-const API_URL = import.meta.env.VITE_API_URL
-  ? `${import.meta.env.VITE_API_URL}/api`
-  : 'http://localhost:8000/api'
+const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000'
+const API_URL = `${API_BASE_URL}/api`
+
+// Stored images are served by the API under relative /api/images/ URLs;
+// pass a width (256 or 512) to get a cached thumbnail instead
+export function resolveImageUrl(url: string, width?: number) {
+  if (!url.startsWith('/')) return url
+  return width ? `${API_BASE_URL}${url}?w=${width}` : `${API_BASE_URL}${url}`
+}
 
 export async function getTemplates() {
   const response = await fetch(`${API_URL}/templates`)
@@ -8,10 +14,22 @@ export async function getTemplates() {
   return response.json()
 }
 
+// List endpoints return one page at a time; follow X-Next-Cursor to the end
+async function fetchAllPages(url: string, error: string) {
+  const items: any[] = []
+  let cursor: string | null = null
+  do {
+    const pageUrl = cursor ? `${url}?cursor=${encodeURIComponent(cursor)}` : url
+    const response = await fetch(pageUrl)
+    if (!response.ok) throw new Error(error)
+    items.push(...(await response.json()))
+    cursor = response.headers.get('X-Next-Cursor')
+  } while (cursor)
+  return items
+}
+
 export async function getPosts() {
-  const response = await fetch(`${API_URL}/posts`)
-  if (!response.ok) throw new Error('Failed to fetch posts')
-  return response.json()
+  return fetchAllPages(`${API_URL}/posts`, 'Failed to fetch posts')
 }
 
 export async function createPost(data: {
@@ -30,11 +48,24 @@ export async function createPost(data: {
 }
 
 export async function getCampaigns() {
-  const response = await fetch(`${API_URL}/campaigns`)
-  if (!response.ok) throw new Error('Failed to fetch campaigns')
+  return fetchAllPages(`${API_URL}/campaigns`, 'Failed to fetch campaigns')
+}
+
+export async function getJob(jobId: string) {
+  const response = await fetch(`${API_URL}/jobs/${jobId}`)
+  if (!response.ok) throw new Error('Failed to fetch job')
   return response.json()
 }
 
+export async function waitForJob(jobId: string, intervalMs = 2000) {
+  while (true) {
+    const job = await getJob(jobId)
+    if (job.status === 'completed') return job
+    if (job.status === 'failed') throw new Error(job.error || 'Job failed')
+    await new Promise((resolve) => setTimeout(resolve, intervalMs))
+  }
+}
+
 export async function createCampaign(data: {
   name: string
   template_type: string
@@ -49,7 +80,12 @@ export async function createCampaign(data: {
     body: JSON.stringify(data)
   })
   if (!response.ok) throw new Error('Failed to create campaign')
-  return response.json()
+  // Campaigns are generated in the background; wait for the job to finish.
+  // Serverless deployments (JOB_INLINE) answer with the job already finished
+  const job = await response.json()
+  if (job.status === 'completed') return job
+  if (job.status === 'failed') throw new Error(job.error || 'Job failed')
+  return waitForJob(job.id)
 }
 
 export async function deletePost(postId: string) {
@@ -1,6 +1,6 @@
 import { useState, useEffect, useRef } from 'react';
 import { Sparkles, Trash2 } from 'lucide-react';
-import { getTemplates, createPost } from '../api';
+import { getTemplates, createPost, resolveImageUrl } from '../api';
 
 interface Template {
   id: string
@@ -221,7 +221,7 @@ export default function CreatePost() {
           {generatedPost.image_url && (
             <div className="aspect-square bg-gray-800">
               <img
-                src={generatedPost.image_url}
+                src={resolveImageUrl(generatedPost.image_url)}
                 alt="Generated content"
                 className="w-full h-full object-cover"
               />
@@ -1,6 +1,6 @@
 import { useEffect, useState } from 'react'
 import { Calendar, TrendingUp, FileText, X, Trash2 } from 'lucide-react'
-import { getPosts, getCampaigns, deletePost } from '../api'
+import { getPosts, getCampaigns, deletePost, resolveImageUrl } from '../api'
 
 interface Post {
   id: string
@@ -139,7 +139,7 @@ export default function Dashboard() {
                 {post.image_url && (
                   <div className="relative aspect-square bg-gray-800">
                     <img
-                      src={post.image_url}
+                      src={resolveImageUrl(post.image_url, 512)}
                       alt="Generated post"
                       className="w-full h-full object-cover"
                       onError={(e) => {
@@ -265,7 +265,7 @@ export default function Dashboard() {
               {selectedPost.image_url && (
                 <div className="mb-6 rounded-xl overflow-hidden bg-gray-800">
                   <img
-                    src={selectedPost.image_url}
+                    src={resolveImageUrl(selectedPost.image_url)}
                     alt="Post"
                     className="w-full h-auto"
                   />